@@ -0,0 +1,180 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+const os = require('os');
+
+// Keeps a few `reader.py --mode worker` processes warm and hands them
+// PDF jobs over JSON lines, so each file skips interpreter startup and imports.
+// Nothing uses it yet; the first caller should also call shutdown() on exit.
+class ReaderWorkerPool {
+  constructor() {
+    this.pythonBin = process.env.READER_PYTHON || 'python3';
+    this.scriptPath = process.env.READER_SCRIPT_PATH
+      || path.resolve(__dirname, '../../../mcp_rag_v1/reader.py');
+    this.size = parseInt(process.env.READER_WORKERS, 10) || Math.max(1, Math.min(4, os.cpus().length - 1));
+    this.jobTimeoutMs = parseInt(process.env.READER_JOB_TIMEOUT_MS, 10) || 120000;
+
+    this.workers = [];
+    this.queue = [];
+    this.nextJobId = 1;
+    this.started = false;
+    this.stopping = false;
+    this.stats = { completed: 0, failed: 0, restarts: 0 };
+  }
+
+  start() {
+    if (this.started) return;
+    this.started = true;
+    this.stopping = false;
+    for (let i = 0; i < this.size; i++) {
+      this.workers.push(this.spawnWorker());
+    }
+  }
+
+  spawnWorker() {
+    const child = spawn(this.pythonBin, [this.scriptPath, '--mode', 'worker'], {
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+    const worker = { child, ready: false, job: null };
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => {
+      this.handleLine(worker, line);
+    });
+    child.stderr.on('data', (data) => {
+      console.error(`reader worker ${child.pid}: ${data.toString().trim()}`);
+    });
+    child.on('error', (error) => {
+      console.error('Failed to start reader worker:', error.message);
+      this.handleExit(worker, null);
+    });
+    child.on('exit', (code) => this.handleExit(worker, code));
+
+    return worker;
+  }
+
+  handleLine(worker, line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.error('Unparseable reader worker output:', line);
+      return;
+    }
+
+    if (message.ready) {
+      worker.ready = true;
+      this.dispatch();
+      return;
+    }
+
+    const job = worker.job;
+    if (!job || message.id !== job.id) return;
+    worker.job = null;
+    clearTimeout(job.timer);
+
+    if (message.success) {
+      this.stats.completed++;
+      job.resolve(message.qa_pairs);
+    } else {
+      this.stats.failed++;
+      job.reject(new Error(message.error));
+    }
+    this.dispatch();
+  }
+
+  handleExit(worker, code) {
+    if (worker.exited) return;
+    worker.exited = true;
+    this.workers = this.workers.filter(w => w !== worker);
+    if (worker.job) {
+      clearTimeout(worker.job.timer);
+      this.stats.failed++;
+      worker.job.reject(new Error(`Reader worker exited with code ${code}`));
+    }
+    if (this.stopping) return;
+
+    if (!worker.ready) {
+      // Broken interpreter or script: respawning would just loop
+      if (!this.workers.length) {
+        this.started = false;
+        for (const job of this.queue.splice(0)) {
+          job.reject(new Error(`Reader worker failed to start (${this.pythonBin} ${this.scriptPath})`));
+        }
+      }
+      return;
+    }
+
+    // Replace crashed or timed-out workers so the pool stays at full size
+    console.error(`Reader worker ${worker.child.pid} exited with code ${code}; restarting`);
+    this.stats.restarts++;
+    this.workers.push(this.spawnWorker());
+  }
+
+  dispatch() {
+    for (const worker of this.workers) {
+      if (!this.queue.length) return;
+      if (!worker.ready || worker.job) continue;
+
+      const job = this.queue.shift();
+      worker.job = job;
+      job.timer = setTimeout(() => {
+        // A stuck PDF: kill the worker; handleExit rejects the job and respawns
+        worker.child.kill('SIGKILL');
+      }, this.jobTimeoutMs);
+      worker.child.stdin.write(JSON.stringify({
+        id: job.id,
+        path: job.filePath,
+        max_pairs: job.maxPairs
+      }) + '\n');
+    }
+  }
+
+  extractQA(filePath, options = {}) {
+    this.start();
+    return new Promise((resolve, reject) => {
+      this.queue.push({
+        id: this.nextJobId++,
+        filePath: path.resolve(filePath),
+        maxPairs: options.maxPairs || 50,
+        resolve,
+        reject
+      });
+      this.dispatch();
+    });
+  }
+
+  // Results in input order; a failed file yields { filePath, error } instead of rejecting the batch
+  async extractQABatch(filePaths, options = {}) {
+    return Promise.all(filePaths.map(filePath =>
+      this.extractQA(filePath, options)
+        .then(qaPairs => ({ filePath, qaPairs }))
+        .catch(error => ({ filePath, error: error.message }))
+    ));
+  }
+
+  getStats() {
+    return {
+      started: this.started,
+      size: this.size,
+      ready: this.workers.filter(w => w.ready).length,
+      busy: this.workers.filter(w => w.job).length,
+      queued: this.queue.length,
+      ...this.stats
+    };
+  }
+
+  async shutdown() {
+    this.stopping = true;
+    this.started = false;
+    for (const job of this.queue.splice(0)) {
+      job.reject(new Error('Reader worker pool is shutting down'));
+    }
+    await Promise.all(this.workers.map(worker => new Promise((resolve) => {
+      worker.child.once('exit', resolve);
+      worker.child.stdin.end(); // Workers exit when stdin closes
+    })));
+    this.workers = [];
+  }
+}
+
+module.exports = new ReaderWorkerPool();
@@ -0,0 +1,9 @@
+# component_based_workflow/benchmarks - Offline benchmark and load-test suite
+#
+# Run from the component_based_workflow directory:
+#
+#   python -m benchmarks.run --suite all --output bench.json
+#   python -m benchmarks.run --suite micro --baseline bench.json --fail-on-regression
+#
+# Nothing here talks to the network: ChatGroq and HuggingFaceEmbeddings are
+# replaced with deterministic local fakes and the input PDFs are generated.
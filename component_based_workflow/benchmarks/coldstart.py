@@ -0,0 +1,58 @@
+# component_based_workflow/benchmarks/coldstart.py - Import time and first-response latency of a fresh process
+
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+from benchmarks.results import summarize
+
+# Runs in a fresh interpreter: import main, start the lifespan, hit /health and /models once
+_PROBE = r"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+imported = time.perf_counter()
+
+import httpx
+
+async def probe():
+    timings = {}
+    async with main.app.router.lifespan_context(main.app):
+        timings["ready_ms"] = (time.perf_counter() - start) * 1000
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in ("/health", "/models"):
+                request_start = time.perf_counter()
+                response = await client.get(path)
+                assert response.status_code == 200
+                timings[path] = (time.perf_counter() - request_start) * 1000
+    return timings
+
+timings = asyncio.run(probe())
+timings["import_ms"] = (imported - start) * 1000
+timings["heavy_modules_loaded"] = sorted(m for m in ("langchain", "chromadb", "networkx", "langchain_groq") if m in sys.modules)
+print(json.dumps(timings))
+"""
+
+
+def run_coldstart(workdir: str, repeat: int) -> Dict[str, Any]:
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "MCQ_WARMUP"}
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _PROBE, package_dir],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    return {
+        "import_main": summarize([run["import_ms"] for run in runs]),
+        "time_to_ready": summarize([run["ready_ms"] for run in runs]),
+        "first_health": summarize([run["/health"] for run in runs]),
+        "first_models": summarize([run["/models"] for run in runs]),
+        "heavy_modules_loaded": runs[-1]["heavy_modules_loaded"],
+    }
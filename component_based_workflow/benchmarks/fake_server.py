@@ -0,0 +1,37 @@
+# component_based_workflow/benchmarks/fake_server.py - Multi-worker server backed by local fakes
+#
+#   python -m benchmarks.fake_server --workers 4 --port 8100 --workdir /tmp/bench
+
+import argparse
+import logging
+import os
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with fake providers under serve.run")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workdir", default=".")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--embedding-weights-mb", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.chdir(args.workdir)
+
+    import main as workflow_main
+    from benchmarks.fakes import install_fakes
+    from serve import ServeConfig, run
+
+    install_fakes(workflow_main, llm_latency=args.llm_latency,
+                  embedding_weights_mb=args.embedding_weights_mb)
+    config = ServeConfig(host="127.0.0.1", port=args.port, workers=args.workers,
+                         preload_models=[workflow_main.DEFAULT_EMBEDDING_MODEL])
+    workflow_main.check_worker_storage(config.workers)
+    run(workflow_main.app, config, preload=workflow_main.prepare_workers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,134 @@
+# component_based_workflow/benchmarks/fakes.py - Deterministic local stand-ins for remote services
+
+import asyncio
+import functools
+import hashlib
+import http
+import itertools
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+EMBEDDING_SIZE = 384  # Same dimension as all-MiniLM-L6-v2
+
+_calls = itertools.count()
+
+
+class FakeRateLimitError(RuntimeError):
+    """Raised by FakeChatModel for the share of calls set by `error_ratio`."""
+    status_code = 429
+
+
+class FakeServerError(RuntimeError):
+    """Raised instead of FakeRateLimitError when `error_status` is not 429, e.g. 503 or 401."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"{status_code} {http.HTTPStatus(status_code).phrase} (fake)")
+        self.status_code = status_code
+
+
+# Stand-in for model weights so memory-sharing benchmarks have something to share
+_fake_weights: Dict[str, np.ndarray] = {}
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers instantly (or after `latency` seconds) without network.
+
+    Accepts the same constructor arguments the nodes pass to ChatGroq so it can be
+    swapped in for any provider class. Responses are derived from a hash of the
+    prompt, so repeated runs produce identical output.
+    """
+
+    model: str = "fake-llm"
+    temperature: float = 0.0
+    max_tokens: Optional[int] = None
+    api_key: Optional[str] = None
+    max_retries: int = 0
+    latency: float = 0.0
+    jitter: float = 0.0
+    tail_latency: float = 0.0  # Extra delay for a `tail_ratio` share of calls
+    tail_ratio: float = 0.0
+    error_ratio: float = 0.0
+    error_status: int = 429
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _delay(self, prompt: str) -> float:
+        # Seeded per call number so a run is reproducible but calls still differ
+        rng = random.Random(f"{_digest(prompt)}:{next(_calls)}")
+        if rng.random() < self.error_ratio:
+            if self.error_status == 429:
+                raise FakeRateLimitError("429 Too Many Requests (fake)")
+            raise FakeServerError(self.error_status)
+        delay = self.latency + (rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if self.tail_ratio and rng.random() < self.tail_ratio:
+            delay += self.tail_latency
+        return max(0.0, delay)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "multiple choice" in prompt.lower():
+            content = _fake_mcq(prompt)
+        else:
+            content = f"Answer {_digest(prompt)[:12]} based on the provided context."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay(str(messages)))
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay(str(messages)))
+        return self._respond(messages)
+
+
+def fake_embeddings(model_name: Optional[str] = None, weights_mb: int = 0,
+                    **kwargs: Any) -> DeterministicFakeEmbedding:
+    if weights_mb and model_name not in _fake_weights:
+        # Filled with ones so the pages are really resident, like loaded weights
+        _fake_weights[model_name] = np.ones(weights_mb * 1024 * 1024 // 8)
+    return DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+
+
+def install_fakes(main_module, llm_latency: float = 0.0, llm_jitter: float = 0.0,
+                  embedding_weights_mb: int = 0):
+    """Replace every remote-backed class in `main_module` with a local fake."""
+    # Fake providers have no quota; keep the default provider rate limits out of the
+    # measurements unless MCQ_RATE_LIMITS is set explicitly (inherited by fake_server)
+    unlimited = {"rpm": 10 ** 6, "tpm": 10 ** 9}
+    os.environ.setdefault("MCQ_RATE_LIMITS", json.dumps({name: unlimited for name in ("groq", "openai", "google")}))
+    chat_model = functools.partial(FakeChatModel, latency=llm_latency, jitter=llm_jitter)
+    for name in ("ChatGroq", "ChatOpenAI", "ChatGoogleGenerativeAI"):
+        setattr(main_module, name, chat_model)
+    main_module.HuggingFaceEmbeddings = functools.partial(fake_embeddings, weights_mb=embedding_weights_mb)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _fake_mcq(prompt: str) -> str:
+    digest = _digest(prompt)
+    return json.dumps({
+        "question": f"Which statement about topic {digest[:6]} is supported by the document?",
+        "options": {
+            "A": f"Statement {digest[6:10]}",
+            "B": f"Statement {digest[10:14]}",
+            "C": f"Statement {digest[14:18]}",
+            "D": f"Statement {digest[18:22]}",
+        },
+        "correct_answer": "ABCD"[int(digest[22], 16) % 4],
+        "explanation": "The document states this directly.",
+    })
@@ -0,0 +1,130 @@
+# component_based_workflow/benchmarks/load.py - Concurrent end-to-end load run against the FastAPI app
+
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.results import summarize
+from benchmarks.synthetic_pdf import PDF_SIZES, write_pdf
+
+logger = logging.getLogger(__name__)
+
+API_KEY = "fake-api-key"
+USER_ID = "load_user"
+
+
+async def _upload(client: httpx.AsyncClient, pdf_path: str) -> str:
+    with open(pdf_path, "rb") as pdf_file:
+        response = await client.post(
+            "/upload_pdf",
+            files={"file": (os.path.basename(pdf_path), pdf_file, "application/pdf")},
+            data={"user_id": USER_ID}
+        )
+    body = response.json()
+    if not body.get("success"):
+        raise RuntimeError(f"Upload failed: {body}")
+    return body["vector_store_id"]
+
+
+def _request_plan(vector_store_id: str, mcq_questions: int) -> List[Dict[str, Any]]:
+    # Interactive queries dominate real traffic; one MCQ batch per four queries
+    query = {
+        "url": "/query",
+        "data": {"user_id": USER_ID, "vector_store_id": vector_store_id,
+                 "query": "Summarize the main concept of the document", "api_key": API_KEY}
+    }
+    mcq = {
+        "url": "/generate_mcq",
+        # Measure generation itself, not question bank hits or the refills they trigger
+        "data": {"user_id": USER_ID, "vector_store_id": vector_store_id,
+                 "num_questions": str(mcq_questions), "api_key": API_KEY, "use_question_bank": "false"}
+    }
+    return [query, query, query, query, mcq]
+
+
+async def drive_load(client: httpx.AsyncClient, pdf_path: str, total_requests: int, concurrency: int,
+                     mcq_questions: int) -> Dict[str, Any]:
+    """Upload `pdf_path`, then issue `total_requests` mixed requests from `concurrency` clients."""
+    vector_store_id = await _upload(client, pdf_path)
+    plan = _request_plan(vector_store_id, mcq_questions)
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    counter = iter(range(total_requests))
+
+    async def worker():
+        for index in counter:
+            request = plan[index % len(plan)]
+            start = time.perf_counter()
+            try:
+                response = await client.post(request["url"], data=request["data"])
+                ok = response.status_code == 200 and response.json().get("success")
+            except Exception:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            latencies.setdefault(request["url"], []).append(elapsed)
+            if not ok:
+                errors[request["url"]] = errors.get(request["url"], 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    all_latencies = [value for samples in latencies.values() for value in samples]
+    return {
+        "requests": len(all_latencies),
+        "errors": sum(errors.values()),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(all_latencies) / duration, 3) if duration else 0.0,
+        "latency": summarize(all_latencies),
+        "endpoints": {
+            url: {**summarize(samples), "errors": errors.get(url, 0)}
+            for url, samples in latencies.items()
+        },
+    }
+
+
+# Runs in a fresh interpreter so peak RSS is the load run's alone, not whatever other
+# suites in the same benchmark process allocated first. The app's lifespan runs too,
+# so the scheduler and question bank are started and shut down as in a real server.
+_PROBE = r"""
+import asyncio, json, sys
+sys.path.insert(0, sys.argv[1])
+import httpx
+import main
+from benchmarks.fakes import install_fakes
+from benchmarks.load import drive_load
+from benchmarks.results import peak_rss_mb
+pdf_path, total_requests, concurrency, mcq_questions = sys.argv[2], *map(int, sys.argv[3:6])
+install_fakes(main, llm_latency=float(sys.argv[6]), llm_jitter=float(sys.argv[7]))
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await drive_load(client, pdf_path, total_requests, concurrency, mcq_questions)
+
+result = asyncio.run(run())
+print(json.dumps({**result, "peak_rss_mb": peak_rss_mb()}))
+"""
+
+
+def run_load(workdir: str, size: str, total_requests: int, concurrency: int, llm_latency: float,
+             llm_jitter: float = 0.0, mcq_questions: int = 3) -> Dict[str, Any]:
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    pdf_path = write_pdf(os.path.join(workdir, f"load_{size}.pdf"), PDF_SIZES[size], seed=42)
+    logger.info(f"Load run: {total_requests} requests at concurrency {concurrency}")
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE, package_dir, pdf_path, str(total_requests), str(concurrency),
+         str(mcq_questions), str(llm_latency), str(llm_jitter)],
+        cwd=workdir, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {f"concurrency_{concurrency}": result}
@@ -0,0 +1,109 @@
+# component_based_workflow/benchmarks/memory.py - Peak RSS of a multi-node workflow, keeping vs releasing payloads
+
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+from benchmarks.synthetic_pdf import PDF_SIZES, write_pdf
+
+# Runs in a fresh interpreter per mode so one run's peak can't hide the other's:
+# pdf_reader -> vector_store -> {query (batch), mcq_generator}. tracemalloc slows the
+# run several times over, so heap figures come from a separate traced run.
+_PROBE = r"""
+import gc, json, os, sys, threading, time, tracemalloc
+sys.path.insert(0, sys.argv[1])
+import main
+from benchmarks.fakes import install_fakes
+install_fakes(main, llm_latency=0.0)
+pdf_path, mode, trace = sys.argv[2], sys.argv[3], sys.argv[4] == "trace"
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+
+def build():
+    workflow = main.Workflow()
+    workflow.add_node(main.PDFReaderNode("pdf_reader", "PDF Reader"))
+    workflow.add_node(main.VectorStoreNode("vector_store", "Vector Store", main.VectorStoreNodeConfig()))
+    workflow.add_node(main.QueryNode("query", "Query", main.QueryNodeConfig(api_key="fake")))
+    workflow.add_node(main.MCQGeneratorNode("mcq_generator", "MCQ Generator",
+                                            main.MCQGeneratorConfig(api_key="fake", num_questions=3)))
+    workflow.add_edge("pdf_reader", "vector_store")
+    workflow.add_edge("vector_store", "query")
+    workflow.add_edge("vector_store", "mcq_generator")
+    return workflow
+
+inputs = main.NodeInput(data={"file_path": pdf_path, "user_id": "bench_memory",
+                              "queries": [f"What is discussed in chapter {n}?" for n in range(1, 6)]})
+build().execute("pdf_reader", inputs, keep_outputs=())  # Warm imports and models outside the measurement
+gc.collect()
+
+samples, running = [], True
+def sample():
+    while running:
+        samples.append(rss_mb())
+        time.sleep(0.002)
+
+workflow = build()
+gc.collect()
+before = rss_mb()
+sampler = threading.Thread(target=sample, daemon=True)
+sampler.start()
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+results = workflow.execute("pdf_reader", inputs, keep_outputs=None if mode == "keep_all" else ())
+elapsed = (time.perf_counter() - start) * 1000
+running = False
+sampler.join()
+gc.collect()
+# RSS rarely shrinks after frees; the traced heap shows what the results still hold
+heap_retained, heap_peak = tracemalloc.get_traced_memory() if trace else (0, 0)
+tracemalloc.stop()
+
+assert all(output.success for output in results.values()), {k: v.error for k, v in results.items()}
+print(json.dumps({
+    "rss_before_mb": round(before, 2),
+    "peak_rss_mb": round(max(samples + [before]), 2),
+    "peak_growth_mb": round(max(samples + [before]) - before, 2),
+    "retained_mb": round(rss_mb() - before, 2),
+    "heap_peak_mb": round(heap_peak / (1024 * 1024), 2),
+    "heap_retained_mb": round(heap_retained / (1024 * 1024), 2),
+    "execute_ms": round(elapsed, 2),
+    "retained_outputs": sorted(f"{node}.{key}" for node, output in results.items()
+                               for key in ("documents", "vector_store") if key in output.data),
+}))
+"""
+
+MODES = ("keep_all", "release")
+
+
+def run_memory(workdir: str, pages: int = PDF_SIZES["large"], repeat: int = 3) -> Dict[str, Any]:
+    """keep_all is how execute() behaved before payload release; release keeps no large outputs."""
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    pdf_path = write_pdf(os.path.join(workdir, f"memory_{pages}.pdf"), pages, seed=11)
+    results: Dict[str, Any] = {"pages": pages}
+    for mode in MODES:
+        def probe(kind):
+            completed = subprocess.run(
+                [sys.executable, "-c", _PROBE, package_dir, pdf_path, mode, kind],
+                cwd=workdir, capture_output=True, text=True, check=True
+            )
+            return json.loads(completed.stdout.strip().splitlines()[-1])
+
+        runs = [probe("rss") for _ in range(repeat)]
+        traced = probe("trace")
+        # Medians: peak RSS is noisy from allocator and GC timing
+        median = {key: sorted(run[key] for run in runs)[len(runs) // 2]
+                  for key in ("peak_rss_mb", "peak_growth_mb", "retained_mb", "execute_ms")}
+        results[mode] = {
+            **median,
+            "heap_peak_mb": traced["heap_peak_mb"],
+            "heap_retained_mb": traced["heap_retained_mb"],
+            "retained_outputs": traced["retained_outputs"],
+        }
+    return results
@@ -0,0 +1,125 @@
+# component_based_workflow/benchmarks/micro.py - Per-node and workflow micro-benchmarks
+
+import itertools
+import logging
+import os
+from typing import Any, Dict, List
+
+from benchmarks.results import measure
+from benchmarks.synthetic_pdf import PDF_SIZES, write_pdf
+
+logger = logging.getLogger(__name__)
+
+API_KEY = "fake-api-key"
+
+
+def _ingest(main, pdf_path: str, user_id: str) -> Dict[str, Any]:
+    reader = main.PDFReaderNode("pdf_reader", "PDF Reader")
+    documents = reader.run(main.NodeInput(data={"file_path": pdf_path, "user_id": user_id}))
+    store = main.VectorStoreNode("vector_store", "Vector Store", main.VectorStoreNodeConfig())
+    output = store.run(main.NodeInput(data=documents.data))
+    if not output.success:
+        raise RuntimeError(f"Ingestion failed: {output.error}")
+    return output.data
+
+
+def bench_pdf_reader(main, pdf_paths: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    node = main.PDFReaderNode("pdf_reader", "PDF Reader")
+    return {
+        size: measure(lambda: node.run(main.NodeInput(data={"file_path": path, "user_id": "bench"})), repeat)
+        for size, path in pdf_paths.items()
+    }
+
+
+def bench_vector_store(main, pdf_paths: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    reader = main.PDFReaderNode("pdf_reader", "PDF Reader")
+    node = main.VectorStoreNode("vector_store", "Vector Store", main.VectorStoreNodeConfig())
+    results = {}
+    for size, path in pdf_paths.items():
+        documents = reader.run(main.NodeInput(data={"file_path": path, "user_id": "bench"})).data
+        results[size] = measure(lambda: node.run(main.NodeInput(data=documents)), repeat)
+    return results
+
+
+def bench_query(main, collection: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    config = main.QueryNodeConfig(api_key=API_KEY)
+    inputs = main.NodeInput(data={
+        "user_id": collection["user_id"],
+        "vector_store_id": collection["vector_store_id"],
+        "persist_directory": collection["persist_directory"],
+        "query": "What is the relation between the model and the system?"
+    })
+    node = main.QueryNode("query", "Query", config)
+    questions = [f"What does section {i} say about the {topic}?"
+                 for i, topic in enumerate(["model", "system", "signal", "memory", "network"] * 2)]
+    batch_inputs = main.NodeInput(data={**inputs.data, "queries": questions})
+
+    def sequential():
+        for question in questions:
+            node.run(main.NodeInput(data={**inputs.data, "query": question}))
+
+    return {
+        "run": measure(lambda: node.run(inputs), repeat),
+        "construct_and_run": measure(lambda: main.QueryNode("query", "Query", config).run(inputs), repeat),
+        f"sequential_{len(questions)}": measure(sequential, repeat),
+        f"batch_{len(questions)}": measure(lambda: node.run(batch_inputs), repeat),
+    }
+
+
+def bench_mcq(main, collection: Dict[str, Any], repeat: int, num_questions: int = 5) -> Dict[str, Any]:
+    config = main.MCQGeneratorConfig(api_key=API_KEY, num_questions=num_questions)
+    node = main.MCQGeneratorNode("mcq_generator", "MCQ Generator", config)
+    inputs = main.NodeInput(data={
+        "user_id": collection["user_id"],
+        "vector_store_id": collection["vector_store_id"],
+        "persist_directory": collection["persist_directory"]
+    })
+    return {f"{num_questions}_questions": measure(lambda: node.run(inputs), repeat)}
+
+
+def bench_question_bank(main, collection: Dict[str, Any], repeat: int, num_questions: int = 5) -> Dict[str, Any]:
+    from question_bank import QuestionBank
+
+    bank = QuestionBank(os.path.join(collection["persist_directory"], "bench_question_bank.sqlite3"))
+    config = main.MCQGeneratorConfig(api_key=API_KEY)
+    questions = main.generate_bank_questions(config, collection["user_id"], collection["vector_store_id"],
+                                             "medium", num_questions * (repeat + 1))
+    bank.add(collection["user_id"], collection["vector_store_id"], "medium", questions)
+    viewers = (f"viewer_{index}" for index in itertools.count())  # Every run is a viewer with nothing seen
+    try:
+        return {f"{num_questions}_questions_from_bank": measure(
+            lambda: bank.take(collection["user_id"], collection["vector_store_id"], "medium", next(viewers),
+                              num_questions), repeat
+        )}
+    finally:
+        bank.close()
+
+
+def bench_workflow(main, pdf_paths: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    def execute(path):
+        workflow = main.Workflow()
+        workflow.add_node(main.PDFReaderNode("pdf_reader", "PDF Reader"))
+        workflow.add_node(main.VectorStoreNode("vector_store", "Vector Store", main.VectorStoreNodeConfig()))
+        workflow.add_edge("pdf_reader", "vector_store")
+        results = workflow.execute("pdf_reader", main.NodeInput(data={"file_path": path, "user_id": "bench"}))
+        if not results["vector_store"].success:
+            raise RuntimeError(results["vector_store"].error)
+
+    return {size: measure(lambda: execute(path), repeat) for size, path in pdf_paths.items()}
+
+
+def run_micro(main, workdir: str, sizes: List[str], repeat: int) -> Dict[str, Any]:
+    pdf_paths = {
+        size: write_pdf(os.path.join(workdir, f"{size}.pdf"), PDF_SIZES[size], seed=index)
+        for index, size in enumerate(sizes)
+    }
+    collection = _ingest(main, pdf_paths[sizes[0]], "bench_query")
+
+    logger.info(f"Benchmarking nodes on sizes: {', '.join(sizes)}")
+    return {
+        "pdf_reader": bench_pdf_reader(main, pdf_paths, repeat),
+        "vector_store": bench_vector_store(main, pdf_paths, repeat),
+        "query": bench_query(main, collection, repeat),
+        "mcq_generator": {**bench_mcq(main, collection, repeat), **bench_question_bank(main, collection, repeat)},
+        "workflow_execute": bench_workflow(main, pdf_paths, repeat),
+    }
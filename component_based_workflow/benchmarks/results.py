@@ -0,0 +1,132 @@
+# component_based_workflow/benchmarks/results.py - Timing statistics, JSON persistence and baseline comparison
+
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Metrics compared against a baseline. Higher is worse for all of them except throughput.
+LOWER_IS_BETTER = ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb", "total_pss_mb", "heap_retained_mb")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples_ms),
+        "min_ms": round(min(samples_ms), 3) if samples_ms else 0.0,
+        "mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Call `fn` `warmup + repeat` times and summarize the timed runs."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def build_report(config: Dict[str, Any], sections: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": config,
+        },
+        **sections,
+    }
+
+
+def save_report(report: Dict[str, Any], path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as report_file:
+        return json.load(report_file)
+
+
+def _flatten(tree: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """List metrics present in both reports that got worse by more than `threshold` (a ratio)."""
+    current_flat = _flatten({k: v for k, v in current.items() if k != "meta"})
+    baseline_flat = _flatten({k: v for k, v in baseline.items() if k != "meta"})
+
+    regressions = []
+    for name, value in sorted(current_flat.items()):
+        metric = name.rsplit(".", 1)[-1]
+        previous = baseline_flat.get(name)
+        if previous is None or previous <= 0:
+            continue
+        if metric in LOWER_IS_BETTER:
+            change = (value - previous) / previous
+        elif metric in HIGHER_IS_BETTER:
+            change = (previous - value) / previous
+        else:
+            continue
+        if change > threshold:
+            regressions.append({
+                "metric": name,
+                "baseline": previous,
+                "current": value,
+                "change_pct": round(change * 100, 1),
+            })
+    return regressions
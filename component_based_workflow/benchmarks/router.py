@@ -0,0 +1,92 @@
+# component_based_workflow/benchmarks/router.py - Tail latency and failover of the hedged LLM router
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeChatModel
+from benchmarks.results import summarize
+from llm_router import LLMRoute, LLMRouter, reset_route_health, route_metrics
+from rate_limiter import configure_limiter, rate_limit_metrics, reset_limiters
+
+PROMPT = "Summarize the document in one sentence."
+
+
+async def _drive(router: LLMRouter, calls: int, concurrency: int) -> Dict[str, Any]:
+    limit = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await router.ainvoke(f"{PROMPT} #{index}")
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(index) for index in range(calls)))
+    return {**summarize(latencies), "errors": errors}
+
+
+def _scenario(routes: List[LLMRoute], calls: int, concurrency: int, **router_options) -> Dict[str, Any]:
+    reset_route_health()
+    reset_limiters()
+    for route in routes:
+        # Limits high enough that only the router's behaviour is measured
+        configure_limiter(route.provider, route.model, requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9)
+    router = LLMRouter(routes, **router_options)
+    result = asyncio.run(_drive(router, calls, concurrency))
+    return {"latency": result, "routes": route_metrics(), "rate_limits": rate_limit_metrics()}
+
+
+def _priority_scenario(llm_latency: float, bulk_calls: int = 30, interactive_calls: int = 10,
+                       requests_per_second: int = 10) -> Dict[str, Any]:
+    """Bulk MCQ calls queue up first; interactive queries arriving later should overtake them."""
+    reset_route_health()
+    reset_limiters()
+    route = LLMRoute("groq", "fake-limited", FakeChatModel(latency=llm_latency))
+    limiter = configure_limiter(route.provider, route.model, requests_per_minute=requests_per_second * 60,
+                                tokens_per_minute=10 ** 9)
+    limiter.requests.tokens = 0  # Start drained, as under sustained load
+    bulk = LLMRouter([route], priority="bulk", default_hedge_delay=3600)
+    interactive = LLMRouter([route], priority="interactive", default_hedge_delay=3600)
+
+    async def drive():
+        timings: Dict[str, List[float]] = {"bulk": [], "interactive": []}
+
+        async def one(router: LLMRouter, kind: str, index: int):
+            start = time.perf_counter()
+            await router.ainvoke(f"{PROMPT} {kind} #{index}")
+            timings[kind].append((time.perf_counter() - start) * 1000)
+
+        bulk_tasks = [asyncio.ensure_future(one(bulk, "bulk", i)) for i in range(bulk_calls)]
+        await asyncio.sleep(0.2)
+        await asyncio.gather(*bulk_tasks, *(one(interactive, "interactive", i) for i in range(interactive_calls)))
+        return {kind: summarize(samples) for kind, samples in timings.items()}
+
+    return {"latency": asyncio.run(drive()), "rate_limits": rate_limit_metrics()}
+
+
+def run_router(calls: int, concurrency: int, llm_latency: float) -> Dict[str, Any]:
+    # Primary is fast but 5% of calls stall for 20x its latency; secondary is slower but steady
+    def slow_tail_primary():
+        return LLMRoute("groq", "fake-primary", FakeChatModel(
+            latency=llm_latency, tail_latency=llm_latency * 20, tail_ratio=0.05))
+
+    def steady_secondary():
+        return LLMRoute("openai", "fake-secondary", FakeChatModel(latency=llm_latency * 1.5))
+
+    def failing_primary():
+        # An outage, not throttling: 429s go to the rate limiter and never open the circuit
+        return LLMRoute("groq", "fake-primary", FakeChatModel(latency=llm_latency, error_ratio=1.0, error_status=503))
+
+    hedge_options = {"default_hedge_delay": llm_latency * 3, "min_hedge_delay": llm_latency, "min_samples": 20}
+    return {
+        "single_provider": _scenario([slow_tail_primary()], calls, concurrency),
+        "hedged": _scenario([slow_tail_primary(), steady_secondary()], calls, concurrency, **hedge_options),
+        "failover": _scenario([failing_primary(), steady_secondary()], calls, concurrency, **hedge_options),
+        "rate_limited_priority": _priority_scenario(llm_latency),
+    }
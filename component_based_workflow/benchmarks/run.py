@@ -0,0 +1,103 @@
+# component_based_workflow/benchmarks/run.py - Command line entry point for the benchmark suite
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from benchmarks.fakes import install_fakes
+from benchmarks.results import build_report, compare, load_report, save_report
+from benchmarks.synthetic_pdf import PDF_SIZES
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for component_based_workflow")
+    parser.add_argument("--suite", choices=["micro", "load", "workers", "coldstart", "router", "memory", "tenants", "all"], default="all")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma separated, from: {', '.join(PDF_SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per micro-benchmark")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Uniform +/- jitter on the fake latency")
+    parser.add_argument("--requests", type=int, default=50, help="Total requests in the load run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients in the load run")
+    parser.add_argument("--load-size", default="small", choices=list(PDF_SIZES))
+    parser.add_argument("--router-calls", type=int, default=200, help="LLM calls per router scenario")
+    parser.add_argument("--memory-pages", type=int, default=PDF_SIZES["large"],
+                        help="Pages in the PDF pushed through the memory suite's pipeline")
+    parser.add_argument("--worker-counts", default="1,2,4", help="Worker counts for the workers suite")
+    parser.add_argument("--embedding-weights-mb", type=int, default=256,
+                        help="Size of the fake embedding weights preloaded by the workers suite")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression ratio")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in PDF_SIZES]
+    if unknown:
+        raise SystemExit(f"Unknown PDF sizes: {', '.join(unknown)}")
+
+    output_path = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Nodes persist Chroma collections under ./chroma_db, so run inside a scratch directory
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import main as workflow_main
+    install_fakes(workflow_main, llm_latency=args.llm_latency, llm_jitter=args.llm_jitter)
+
+    from benchmarks.coldstart import run_coldstart
+    from benchmarks.load import run_load
+    from benchmarks.memory import run_memory
+    from benchmarks.micro import run_micro
+    from benchmarks.router import run_router
+    from benchmarks.tenants import run_tenants
+    from benchmarks.workers import run_workers
+
+    sections = {}
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="mcq_bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            if args.suite in ("coldstart", "all"):
+                sections["coldstart"] = run_coldstart(workdir, args.repeat)
+            if args.suite in ("micro", "all"):
+                sections["micro"] = run_micro(workflow_main, workdir, sizes, args.repeat)
+            if args.suite in ("load", "all"):
+                sections["load"] = run_load(workdir, args.load_size, args.requests, args.concurrency,
+                                            args.llm_latency, args.llm_jitter)
+            if args.suite in ("router", "all"):
+                sections["router"] = run_router(args.router_calls, args.concurrency * 2, args.llm_latency)
+            if args.suite in ("tenants", "all"):
+                sections["tenants"] = run_tenants(args.llm_latency)
+            if args.suite in ("memory", "all"):
+                sections["memory"] = run_memory(workdir, args.memory_pages, min(args.repeat, 3))
+            if args.suite in ("workers", "all"):
+                worker_counts = [int(count) for count in args.worker_counts.split(",") if count.strip()]
+                sections["workers"] = run_workers(workdir, worker_counts, args.requests, args.concurrency,
+                                                  args.llm_latency, args.embedding_weights_mb)
+        finally:
+            os.chdir(original_cwd)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    report = build_report(config, sections)
+    save_report(report, output_path)
+    logger.info(f"Benchmark results written to {output_path}")
+
+    if baseline_path:
+        regressions = compare(report, load_report(baseline_path), args.threshold)
+        print(json.dumps({"baseline": baseline_path, "regressions": regressions}, indent=2))
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# component_based_workflow/benchmarks/synthetic_pdf.py - Generate text PDFs without extra dependencies
+
+import random
+from typing import Dict, List
+
+# Named sizes used by the benchmark suite: pages per document
+PDF_SIZES: Dict[str, int] = {
+    "small": 2,
+    "medium": 20,
+    "large": 100,
+}
+
+LINES_PER_PAGE = 45
+WORDS_PER_LINE = 12
+
+_VOCABULARY = (
+    "algorithm analysis architecture boundary cache concept context data definition "
+    "distribution element energy equation evidence experiment function gradient graph "
+    "hypothesis index integration interface kernel language matrix measurement memory "
+    "method model network observation operator parameter pattern principle probability "
+    "process property protocol reaction relation resource sample signal structure "
+    "system theory throughput transfer value variable vector velocity"
+).split()
+
+
+def _page_lines(rng: random.Random, page_number: int) -> List[str]:
+    lines = [f"Chapter {page_number}: The {rng.choice(_VOCABULARY)} of {rng.choice(_VOCABULARY)}"]
+    for _ in range(LINES_PER_PAGE - 1):
+        words = [rng.choice(_VOCABULARY) for _ in range(WORDS_PER_LINE)]
+        lines.append(" ".join(words).capitalize() + ".")
+    return lines
+
+
+def _content_stream(lines: List[str]) -> bytes:
+    parts = ["BT", "/F1 10 Tf", "14 TL", "50 780 Td"]
+    for line in lines:
+        escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        parts.append(f"({escaped}) Tj T*")
+    parts.append("ET")
+    return "\n".join(parts).encode("latin-1")
+
+
+def write_pdf(path: str, pages: int, seed: int = 0) -> str:
+    """Write a `pages`-page text PDF to `path` and return the path.
+
+    The content is pseudo-random prose drawn from a fixed vocabulary, seeded so
+    the same arguments always produce byte-identical files.
+    """
+    rng = random.Random(seed)
+    page_count = max(1, pages)
+
+    # Object layout: 1 catalog, 2 pages tree, 3 font, then (page, content) pairs
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page_number in range(1, page_count + 1):
+        stream = _content_stream(_page_lines(rng, page_number))
+        page_id = len(objects) + 1
+        content_id = page_id + 1
+        page_refs.append(f"{page_id} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {page_count} >>".encode("latin-1")
+
+    body = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_id, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n" % object_id + obj + b"\nendobj\n"
+
+    xref_offset = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        body += b"%010d 00000 n \n" % offset
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+
+    with open(path, "wb") as pdf_file:
+        pdf_file.write(bytes(body))
+    return path
@@ -0,0 +1,60 @@
+# component_based_workflow/benchmarks/tenants.py - Interactive latency next to a heavy user, shared vs per-user queues
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from benchmarks.results import summarize
+from tenant_scheduler import configure_scheduler, shutdown_scheduler
+
+POOL_LIMITS = {"max_concurrency": 4, "tenant_concurrency": 3, "max_queued": 10000, "units_per_minute": None}
+
+
+async def _drive(per_user: bool, llm_latency: float, heavy_jobs: int, heavy_questions: int,
+                 light_queries: int) -> Dict[str, Any]:
+    scheduler = configure_scheduler(pools={"llm": POOL_LIMITS})
+
+    def llm_work(calls: int):
+        time.sleep(calls * llm_latency)  # Stands in for `calls` sequential LLM round trips
+
+    def tenant(user_id: str) -> str:
+        # Without isolation every request lands in one queue, which is how FIFO dispatch behaves
+        return user_id if per_user else "shared"
+
+    heavy_latencies: List[float] = []
+    light_latencies: List[float] = []
+
+    async def heavy(index: int):
+        start = time.perf_counter()
+        await scheduler.run("llm", tenant("heavy_user"), llm_work, heavy_questions, cost=heavy_questions)
+        heavy_latencies.append((time.perf_counter() - start) * 1000)
+
+    async def light():
+        # One interactive user asking questions back to back
+        for _ in range(light_queries):
+            start = time.perf_counter()
+            await scheduler.run("llm", tenant("light_user"), llm_work, 1, cost=1)
+            light_latencies.append((time.perf_counter() - start) * 1000)
+
+    heavy_tasks = [asyncio.ensure_future(heavy(index)) for index in range(heavy_jobs)]
+    await asyncio.sleep(llm_latency)  # The heavy backlog is already queued when the light user arrives
+    start = time.perf_counter()
+    await light()
+    light_done = time.perf_counter() - start
+    await asyncio.gather(*heavy_tasks)
+
+    metrics = scheduler.metrics()["llm"]
+    shutdown_scheduler()
+    return {
+        "light_user": {**summarize(light_latencies), "total_s": round(light_done, 3)},
+        "heavy_user": summarize(heavy_latencies),
+        "tenants": sorted(metrics["tenants"]),
+    }
+
+
+def run_tenants(llm_latency: float, heavy_jobs: int = 24, heavy_questions: int = 10,
+                light_queries: int = 20) -> Dict[str, Any]:
+    return {
+        mode: asyncio.run(_drive(mode == "per_user", llm_latency, heavy_jobs, heavy_questions, light_queries))
+        for mode in ("shared_queue", "per_user")
+    }
@@ -0,0 +1,156 @@
+# component_based_workflow/benchmarks/workers.py - Requests/sec and memory against worker count
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.load import drive_load
+from benchmarks.synthetic_pdf import PDF_SIZES, write_pdf
+
+logger = logging.getLogger(__name__)
+
+STARTUP_TIMEOUT = 120
+
+
+def _children(pid: int) -> List[int]:
+    found = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as children_file:
+                found.extend(int(child) for child in children_file.read().split())
+    except OSError:
+        pass
+    return found
+
+
+def _process_tree(pid: int) -> List[int]:
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(_children(current))
+    return tree
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    """RSS counts shared pages in every process; PSS divides them between the sharers."""
+    memory = {"rss_kb": 0, "pss_kb": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    memory[f"{key.lower()}_kb"] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+def tree_memory_mb(pid: int) -> Dict[str, float]:
+    processes = _process_tree(pid)
+    totals = [_memory_kb(process) for process in processes]
+    return {
+        "processes": len(processes),
+        "total_rss_mb": round(sum(m["rss_kb"] for m in totals) / 1024, 2),
+        "total_pss_mb": round(sum(m["pss_kb"] for m in totals) / 1024, 2),
+    }
+
+
+def _wait_until_ready(base_url: str, process: subprocess.Popen, workers: int):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} during startup")
+        try:
+            # Ready once every worker is forked (master + workers), not just the first one
+            healthy = httpx.get(f"{base_url}/health", timeout=1).status_code == 200
+            if healthy and len(_process_tree(process.pid)) > workers:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready in {STARTUP_TIMEOUT}s")
+
+
+async def _drive(base_url: str, pdf_path: str, total_requests: int, concurrency: int) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        return await drive_load(client, pdf_path, total_requests, concurrency, mcq_questions=3)
+
+
+def _start_chroma(data_dir: str, port: int) -> subprocess.Popen:
+    """A Chroma server for the workers to share; its on-disk store is not multi-process safe."""
+    chroma = os.path.join(os.path.dirname(sys.executable), "chroma")
+    process = subprocess.Popen(
+        [chroma if os.path.exists(chroma) else "chroma", "run", "--path", data_dir,
+         "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Chroma server exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/v2/heartbeat", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Chroma server on port {port} did not become ready in {STARTUP_TIMEOUT}s")
+
+
+def _stop(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def bench_worker_count(workers: int, workdir: str, pdf_path: str, port: int, total_requests: int,
+                       concurrency: int, llm_latency: float, weights_mb: int) -> Dict[str, Any]:
+    server_dir = os.path.join(workdir, f"workers_{workers}")
+    os.makedirs(server_dir, exist_ok=True)
+    # Every worker count uses the Chroma server, so the runs differ only in worker count
+    chroma_port = port + 1000
+    chroma = _start_chroma(os.path.join(server_dir, "chroma_server"), chroma_port)
+    command = [
+        sys.executable, "-m", "benchmarks.fake_server",
+        "--workers", str(workers), "--port", str(port), "--workdir", server_dir,
+        "--llm-latency", str(llm_latency), "--embedding-weights-mb", str(weights_mb),
+    ]
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "MCQ_CHROMA_URL": f"http://127.0.0.1:{chroma_port}"}
+    process = subprocess.Popen(command, cwd=package_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(base_url, process, workers)
+        idle_memory = tree_memory_mb(process.pid)
+        result = asyncio.run(_drive(base_url, pdf_path, total_requests, concurrency))
+        return {**result, "idle": idle_memory, "loaded": tree_memory_mb(process.pid)}
+    finally:
+        # SIGTERM asks the master to drain workers within graceful_timeout
+        _stop(process)
+        _stop(chroma)
+
+
+def run_workers(workdir: str, worker_counts: List[int], total_requests: int, concurrency: int,
+                llm_latency: float, weights_mb: int = 256, base_port: int = 8100) -> Dict[str, Any]:
+    pdf_path = write_pdf(os.path.join(workdir, "workers.pdf"), PDF_SIZES["small"], seed=7)
+    results = {}
+    for offset, workers in enumerate(worker_counts):
+        logger.info(f"Worker benchmark: {workers} workers, {total_requests} requests at concurrency {concurrency}")
+        results[f"workers_{workers}"] = bench_worker_count(
+            workers, workdir, pdf_path, base_port + offset, total_requests,
+            concurrency, llm_latency, weights_mb
+        )
+    return results
@@ -0,0 +1,352 @@
+# component_based_workflow/llm_router.py - Hedged, latency-aware routing across LLM providers
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from rate_limiter import estimate_tokens, error_headers, get_limiter, is_rate_limit_error, percentile
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_auth_error(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in (401, 403) or "Authentication" in type(error).__name__ or "PermissionDenied" in type(error).__name__
+
+
+def fails_over(error: BaseException) -> bool:
+    """Whether another route may succeed where this error's route failed.
+
+    A rejected key is the caller's to fix, and a 429 is this key's quota, which
+    the rate limiter waits out; neither is a provider outage.
+    """
+    return not (is_auth_error(error) or is_rate_limit_error(error))
+
+
+class RollingStats:
+    """Latency and outcome of the most recent calls to one provider/model."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.cancelled = 0
+        self.hedges_started = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, success: bool):
+        with self._lock:
+            self.outcomes.append(success)
+            if success:
+                self.latencies.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self.latencies)
+        return percentile(ordered, pct)
+
+    @property
+    def samples(self) -> int:
+        return len(self.latencies)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            outcomes = list(self.outcomes)
+        return round(outcomes.count(False) / len(outcomes), 4) if outcomes else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "samples": self.samples,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "error_rate": self.error_rate(),
+            "cancelled": self.cancelled,
+            "hedges_started": self.hedges_started,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class CircuitBreaker:
+    """Stops routing to a provider after repeated failures, then probes it again.
+
+    closed -> open after `failure_threshold` consecutive failures; open -> half_open
+    once `recovery_timeout` seconds have passed, letting a single call through;
+    that call's outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            return self.state == "closed" or (self.state == "half_open" and not self._probe_in_flight)
+
+    def acquire(self, probe: bool = False) -> bool:
+        """Claim permission for one call; in half_open only the first caller gets it.
+
+        `probe` claims the single probe slot even while open, for callers with
+        no healthy route left to try.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if (self.state == "half_open" or probe) and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        # A cancelled half-open probe proves nothing either way; let another call probe
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures}
+
+
+# Process-wide health per route key ("provider:model"); nodes are rebuilt per request
+# but share these. Latency and outages belong to the provider, not to an API key, and
+# auth and rate-limit errors never count against the circuit. Model names come from
+# requests, so only the most recently used MAX_ROUTES are kept.
+MAX_ROUTES = 256
+_stats: "OrderedDict[str, RollingStats]" = OrderedDict()
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def _health(key: str) -> Tuple[RollingStats, CircuitBreaker]:
+    with _registry_lock:
+        if key in _stats:
+            _stats.move_to_end(key)
+        else:
+            _stats[key] = RollingStats()
+            _breakers[key] = CircuitBreaker()
+            while len(_stats) > MAX_ROUTES:
+                oldest, _ = _stats.popitem(last=False)
+                del _breakers[oldest]
+        return _stats[key], _breakers[key]
+
+
+def route_metrics() -> Dict[str, Any]:
+    with _registry_lock:
+        keys = sorted(_stats)
+    return {key: {**_stats[key].snapshot(), "circuit": _breakers[key].snapshot()} for key in keys}
+
+
+def reset_route_health():
+    with _registry_lock:
+        _stats.clear()
+        _breakers.clear()
+
+
+# Calls run on one background event loop so a losing hedge can be cancelled
+# mid-request instead of running to completion in a thread.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-router", daemon=True).start()
+        return _loop
+
+
+@dataclass
+class LLMRoute:
+    provider: str
+    model: str
+    client: Any  # Anything with ainvoke(); the langchain chat models in practice
+    credential: str = ""  # credential_id() of the client's API key, for its rate limiter; "" for a server-wide key
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+class LLMRouter:
+    """Sends each prompt to the first healthy route and hedges on slow responses.
+
+    If the call in flight has not finished by the route's `hedge_percentile`
+    latency (clamped to [min_hedge_delay, max_hedge_delay], or
+    `default_hedge_delay` until `min_samples` latencies are known), the same
+    prompt is sent to the next healthy route. The first success wins and the
+    other calls are cancelled. A provider error or open circuit fails over to
+    the next route at once. Auth errors and 429s do not fail over: a 429 is
+    retried on the same route, up to `rate_limit_retries` times, once the rate
+    limiter's pause is over.
+    """
+
+    def __init__(self, routes: List[LLMRoute], hedge_percentile: float = 95.0,
+                 default_hedge_delay: float = 2.0, min_hedge_delay: float = 0.2,
+                 max_hedge_delay: float = 10.0, min_samples: int = 20,
+                 priority: str = "interactive", rate_limit_retries: int = 2):
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = routes
+        self.priority = priority  # Queue class in the shared rate limiter: "interactive" or "bulk"
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.rate_limit_retries = rate_limit_retries
+
+    @property
+    def primary_client(self):
+        return self.routes[0].client
+
+    def _hedge_delay(self, route: LLMRoute) -> float:
+        stats, _ = _health(route.key)
+        if stats.samples < self.min_samples:
+            return self.default_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, stats.percentile(self.hedge_percentile)))
+
+    def _candidates(self) -> Tuple[List[LLMRoute], bool]:
+        """Healthy routes in order, and whether the call must probe an open circuit instead."""
+        healthy = [route for route in self.routes if _health(route.key)[1].available()]
+        if healthy:
+            return healthy, False
+        # With every circuit open, let one call at a time probe the primary rather than
+        # fail every request without a call until the recovery timeout
+        return self.routes[:1], True
+
+    async def _attempt(self, route: LLMRoute, prompt: Any, config: Optional[Dict[str, Any]], probe: bool = False):
+        stats, breaker = _health(route.key)
+        limiter = get_limiter(route.provider, route.model, route.credential)
+        estimated_tokens = estimate_tokens(prompt, getattr(route.client, "max_tokens", None))
+        for retry in range(self.rate_limit_retries + 1):
+            if not probe and not breaker.available():
+                # Fail over now rather than after waiting in the rate limiter's queue
+                raise CircuitOpenError(f"Circuit open for {route.key}")
+            # Queue time counts toward the hedge deadline, but not toward the route's latency stats
+            await limiter.acquire(estimated_tokens, self.priority)
+
+            if not breaker.acquire(probe):
+                raise CircuitOpenError(f"Circuit open for {route.key}")
+            start = time.monotonic()
+            try:
+                result = await route.client.ainvoke(prompt, config=config)
+            except asyncio.CancelledError:
+                stats.cancelled += 1
+                breaker.release()
+                raise
+            except Exception as e:
+                stats.record(time.monotonic() - start, success=False)
+                if is_rate_limit_error(e):
+                    # Throttling is the limiter's job; the provider itself is healthy
+                    breaker.release()
+                    limiter.record_throttle(error_headers(e))
+                    if retry < self.rate_limit_retries:
+                        continue  # acquire() holds the retry until the pause is over
+                elif is_auth_error(e):
+                    # A bad key says nothing about the provider, and retrying it will not help
+                    breaker.release()
+                else:
+                    breaker.record_failure()
+                raise
+            stats.record(time.monotonic() - start, success=True)
+            breaker.record_success()
+            limiter.record_response(result, estimated_tokens)
+            return result
+
+    async def ainvoke(self, prompt: Any, config: Optional[Dict[str, Any]] = None):
+        remaining, probe = self._candidates()
+        in_flight: Dict[asyncio.Task, LLMRoute] = {}
+        last_error: Optional[BaseException] = None
+        hedges = set()
+
+        def launch():
+            route = remaining.pop(0)
+            in_flight[asyncio.ensure_future(self._attempt(route, prompt, config, probe))] = route
+            return route
+
+        launch()
+        try:
+            while in_flight:
+                oldest = next(iter(in_flight.values()))
+                timeout = self._hedge_delay(oldest) if remaining else None
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    route = launch()
+                    hedges.add(route.key)
+                    _health(route.key)[0].hedges_started += 1
+                    logger.info(f"Hedging {oldest.key} after {timeout:.2f}s with {route.key}")
+                    continue
+
+                for task in done:
+                    route = in_flight.pop(task)
+                    if task.exception() is None:
+                        if route.key in hedges:
+                            _health(route.key)[0].hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"LLM call to {route.key} failed: {str(last_error)}")
+                    if not fails_over(last_error):
+                        remaining.clear()  # Calls already in flight may still succeed
+
+                if not in_flight and remaining:
+                    launch()
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        raise last_error
+
+    def invoke(self, prompt: Any, config: Optional[Dict[str, Any]] = None):
+        return asyncio.run_coroutine_threadsafe(self.ainvoke(prompt, config), _event_loop()).result()
+
+    async def abatch(self, prompts: List[Any], config: Optional[Dict[str, Any]] = None,
+                     return_exceptions: bool = False) -> List[Any]:
+        limit = asyncio.Semaphore(max(1, (config or {}).get("max_concurrency") or len(prompts) or 1))
+
+        async def bounded(prompt):
+            async with limit:
+                return await self.ainvoke(prompt)
+
+        return await asyncio.gather(*(bounded(prompt) for prompt in prompts), return_exceptions=return_exceptions)
+
+    def batch(self, prompts: List[Any], config: Optional[Dict[str, Any]] = None,
+              return_exceptions: bool = False) -> List[Any]:
+        future = asyncio.run_coroutine_threadsafe(self.abatch(prompts, config, return_exceptions), _event_loop())
+        return future.result()
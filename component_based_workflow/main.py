@@ -1,32 +1,225 @@
 # component_based_workflow/main.py - Groq Integration
 
+import time
+_MODULE_START = time.perf_counter()
+
 import os
 import json
+import hashlib
+import asyncio
+import importlib
+import math
+import random
 import logging
 import tempfile
+import threading
 import uuid
-from typing import Dict, List, Optional, Any
+from collections import deque
+from urllib.parse import urlparse
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from pydantic import BaseModel, Field
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
-import networkx as nx
 
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PDFMinerLoader
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.chains import RetrievalQA
-from langchain_groq import ChatGroq  # Main Groq import
-from langchain_openai import ChatOpenAI  # Fallback option
-from langchain_google_genai import ChatGoogleGenerativeAI  # Alternative option
+from llm_router import LLMRoute, LLMRouter, route_metrics
+from question_bank import DIFFICULTIES, get_question_bank, question_bank_metrics, shutdown_question_bank
+from rate_limiter import credential_id, rate_limit_metrics, response_header_hook
+from tenant_scheduler import QuotaExceededError, get_scheduler, shutdown_scheduler, tenant_metrics
+
+_CORE_IMPORTS_MS = (time.perf_counter() - _MODULE_START) * 1000
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Heavy dependencies are imported on first use so a cold process can answer
+# /health and /models without loading langchain, Chroma or any provider SDK.
+# name -> (module, attribute); attribute None means the module itself.
+_LAZY_IMPORTS = {
+    "nx": ("networkx", None),
+    "RecursiveCharacterTextSplitter": ("langchain.text_splitter", "RecursiveCharacterTextSplitter"),
+    "PDFMinerLoader": ("langchain_community.document_loaders", "PDFMinerLoader"),
+    "Chroma": ("langchain_community.vectorstores", "Chroma"),
+    "chromadb": ("chromadb", None),  # For the HTTP client to a shared Chroma server
+    "HuggingFaceEmbeddings": ("langchain_community.embeddings", "HuggingFaceEmbeddings"),
+    "PROMPT_SELECTOR": ("langchain.chains.question_answering.stuff_prompt", "PROMPT_SELECTOR"),
+    "ChatGroq": ("langchain_groq", "ChatGroq"),  # Main Groq import
+    "groq": ("groq", None),  # Groq SDK, for its HTTP client
+    "ChatOpenAI": ("langchain_openai", "ChatOpenAI"),  # Fallback option
+    "ChatGoogleGenerativeAI": ("langchain_google_genai", "ChatGoogleGenerativeAI"),  # Alternative option
+}
+
+# Provider registry: provider name -> lazily imported chat model class
+LLM_PROVIDERS = {
+    "groq": "ChatGroq",
+    "openai": "ChatOpenAI",
+    "google": "ChatGoogleGenerativeAI"
+}
+
+# Default model per provider, used by the endpoints and for fallback routes
+DEFAULT_MODELS = {
+    "groq": "llama-3.3-70b-versatile",
+    "openai": "gpt-3.5-turbo",
+    "google": "gemini-pro"
+}
+
+_import_times_ms: Dict[str, float] = {}
+_import_lock = threading.RLock()
+
+def _lazy(name: str):
+    # Anything already bound at module level wins, which also lets callers
+    # substitute a class with `main.ChatGroq = ...` before first use.
+    value = globals().get(name)
+    if value is None:
+        with _import_lock:
+            value = globals().get(name)
+            if value is None:
+                module_name, attribute = _LAZY_IMPORTS[name]
+                start = time.perf_counter()
+                module = importlib.import_module(module_name)
+                value = module if attribute is None else getattr(module, attribute)
+                _import_times_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+                logger.info(f"Imported {name} from {module_name} in {_import_times_ms[name]}ms")
+                globals()[name] = value
+    return value
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_provider_class(provider: str):
+    class_name = LLM_PROVIDERS.get(provider)
+    if not class_name:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    return _lazy(class_name)
+
+def rate_limit_client_options(provider: str, model_name: str, api_key: Optional[str]) -> Dict[str, Any]:
+    """Chat model options that let the shared rate limiter see x-ratelimit-* response headers."""
+    if provider == "openai":
+        return {"include_response_headers": True}
+    if provider == "groq":
+        # ChatGroq drops response headers, so read them off its HTTP client
+        hook = response_header_hook(provider, model_name, credential_id(api_key))
+        return {"http_async_client": _lazy("groq").DefaultAsyncHttpxClient(event_hooks={"response": [hook]})}
+    return {}
+
+def resolve_fallback_key(provider: str, api_key: Optional[str], config: "LLMRoutingConfig") -> Optional[str]:
+    """The request's key for config.fallback_provider; never another vendor's key.
+
+    The server's own provider keys are never used: the endpoints are
+    unauthenticated, so any caller could fail over onto them with a bad primary key.
+    """
+    if config.fallback_api_key:
+        return config.fallback_api_key
+    if config.fallback_provider == provider and api_key:
+        return api_key
+    return None
+
+def build_llm_router(provider: str, model_name: str, api_key: Optional[str],
+                     config: "LLMRoutingConfig", create_client, priority: str = "interactive") -> LLMRouter:
+    """Route to `provider`, plus config.fallback_provider when it has a key.
+
+    `create_client(provider, model_name, api_key, max_retries)` builds each chat
+    model. With a fallback route the primary gets no client-side retries, so an
+    outage or timeout fails over instead of retrying the same provider; the
+    router itself retries a 429 once the rate limiter's pause is over.
+    """
+    fallback_route = None
+    if config.fallback_provider:
+        fallback_model = config.fallback_model_name or DEFAULT_MODELS.get(config.fallback_provider)
+        fallback_key = resolve_fallback_key(provider, api_key, config)
+        if fallback_key:
+            fallback_route = LLMRoute(config.fallback_provider, fallback_model,
+                                      create_client(config.fallback_provider, fallback_model, fallback_key, 3),
+                                      credential_id(fallback_key))
+        else:
+            logger.warning(f"No API key for fallback provider {config.fallback_provider}; routing to {provider} only")
+
+    max_retries = 0 if fallback_route else 3
+    routes = [LLMRoute(provider, model_name, create_client(provider, model_name, api_key, max_retries),
+                       credential_id(api_key))]
+    if fallback_route:
+        routes.append(fallback_route)
+    return LLMRouter(routes, hedge_percentile=config.hedge_percentile, priority=priority)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Shared embedding models: loaded once per process (or once in the master before forking workers)
+_embedding_models: Dict[str, Any] = {}
+_embedding_lock = threading.Lock()
+
+def get_embeddings(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    embeddings = _embedding_models.get(model_name)
+    if embeddings is None:
+        with _embedding_lock:
+            embeddings = _embedding_models.get(model_name)
+            if embeddings is None:
+                logger.info(f"Loading embedding model: {model_name}")
+                embeddings = _lazy("HuggingFaceEmbeddings")(model_name=model_name)
+                _embedding_models[model_name] = embeddings
+    return embeddings
+
+def preload_models(model_names: Optional[List[str]] = None):
+    """Load embedding weights up front, e.g. in the master process before workers fork."""
+    for model_name in model_names or [DEFAULT_EMBEDDING_MODEL]:
+        get_embeddings(model_name)
+
+# Vector stores live in ./chroma_db/{user_id} by default. Chroma's on-disk store is not
+# safe to open from several processes, so multi-worker serving needs MCQ_CHROMA_URL
+# (e.g. http://127.0.0.1:8001, from `chroma run --path ./chroma_db --port 8001`) and
+# every worker talks to that one server instead.
+_chroma_clients: Dict[Tuple[int, str], Any] = {}
+_chroma_lock = threading.Lock()
+
+def chroma_server_client():
+    """HTTP client for MCQ_CHROMA_URL, or None for per-user directories on local disk."""
+    url = os.environ.get("MCQ_CHROMA_URL")
+    if not url:
+        return None
+    key = (os.getpid(), url)  # A forked worker opens its own connection, never its master's
+    with _chroma_lock:
+        if key not in _chroma_clients:
+            parsed = urlparse(url)
+            _chroma_clients[key] = _lazy("chromadb").HttpClient(
+                host=parsed.hostname, port=parsed.port or 8000, ssl=parsed.scheme == "https"
+            )
+        return _chroma_clients[key]
+
+def _server_collection_name(collection_name: str, persist_dir: str) -> str:
+    # One server holds every user's collections; prefix each with its owner's directory,
+    # as local directories do, so a collection id alone never opens another user's store
+    owner = hashlib.sha1(os.path.normpath(persist_dir).encode("utf-8")).hexdigest()[:10]
+    return f"{owner}-{collection_name}"
+
+def vector_store_location(collection_name: str, persist_dir: str) -> Dict[str, Any]:
+    """Chroma keyword arguments locating a user's collection, locally or on the server."""
+    client = chroma_server_client()
+    if client is None:
+        return {"collection_name": collection_name, "persist_directory": persist_dir}
+    return {"collection_name": _server_collection_name(collection_name, persist_dir), "client": client}
+
+def missing_vector_store_error(collection_name: str, persist_dir: str) -> Optional[str]:
+    """Why the user's collection cannot be opened, or None if it exists."""
+    client = chroma_server_client()
+    if client is None:
+        return None if os.path.exists(persist_dir) else f"Vector store directory {persist_dir} does not exist"
+    try:
+        client.get_collection(_server_collection_name(collection_name, persist_dir))
+        return None
+    except Exception:
+        return f"Vector store {collection_name} does not exist"
+
+def check_worker_storage(workers: int):
+    if workers > 1 and not os.environ.get("MCQ_CHROMA_URL"):
+        raise RuntimeError(
+            f"{workers} workers cannot share ./chroma_db on disk; start a Chroma server "
+            "(chroma run --path ./chroma_db --port 8001) and set MCQ_CHROMA_URL, or use one worker"
+        )
+
 # Data Models
 @dataclass
 class NodeInput:
@@ -39,7 +232,7 @@ class NodeInput:
 
 @dataclass
 class NodeOutput:
-    success: bool
+    success: bool = True
     data: Dict[str, Any] = None
     metadata: Dict[str, Any] = None
     error: str = None
@@ -50,8 +243,49 @@ class NodeOutput:
         if self.metadata is None:
             self.metadata = {}
 
+@dataclass
+class PayloadRef:
+    """Stands in for a large output while it is passed between nodes."""
+    handle: str
+    producer: str
+    key: str
+
+class PayloadStore:
+    """Holds large node outputs for one workflow run until every consumer has run."""
+
+    def __init__(self):
+        self._payloads: Dict[str, Any] = {}
+        self._pending: Dict[str, int] = {}
+
+    def put(self, producer: str, key: str, value: Any, consumers: int) -> PayloadRef:
+        ref = PayloadRef(handle=uuid.uuid4().hex, producer=producer, key=key)
+        self._payloads[ref.handle] = value
+        self._pending[ref.handle] = consumers
+        return ref
+
+    def resolve(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: self._payloads[value.handle] if isinstance(value, PayloadRef) else value
+                for key, value in data.items()}
+
+    def release(self, data: Dict[str, Any]):
+        """One consumer is done with the refs in `data`; drop payloads nobody else needs."""
+        for value in data.values():
+            if isinstance(value, PayloadRef) and value.handle in self._pending:
+                self._pending[value.handle] -= 1
+                if self._pending[value.handle] <= 0:
+                    del self._pending[value.handle]
+                    del self._payloads[value.handle]
+                    logger.info(f"Released {value.producer}.{value.key}")
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
 # Base Node Class
 class BaseNode:
+    # Output keys too big to copy around or keep for the whole run; Workflow passes
+    # them by reference and drops them once every successor has consumed them
+    large_outputs: Tuple[str, ...] = ()
+
     def __init__(self, node_id: str, name: str):
         self.node_id = node_id
         self.name = name
@@ -63,7 +297,15 @@ class BaseNode:
         raise NotImplementedError
 
 # Configuration Models with Groq Defaults
-class LLMNodeConfig(BaseModel):
+class LLMRoutingConfig(BaseModel):
+    # Optional secondary provider: used on errors, open circuits, and as a hedge
+    # when the primary is slower than its hedge_percentile latency
+    fallback_provider: Optional[str] = Field(default=None)
+    fallback_model_name: Optional[str] = Field(default=None)
+    fallback_api_key: Optional[str] = Field(default=None)  # Defaults to api_key only when the provider is the same
+    hedge_percentile: float = Field(default=95.0)
+
+class LLMNodeConfig(LLMRoutingConfig):
     provider: str = Field(default="groq")
     model_name: str = Field(default="llama-3.3-70b-versatile")
     temperature: float = Field(default=0.7)
@@ -73,20 +315,25 @@ class LLMNodeConfig(BaseModel):
 class VectorStoreNodeConfig(BaseModel):
     chunk_size: int = Field(default=1000)
     chunk_overlap: int = Field(default=200)
-    embedding_model_name: str = Field(default="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model_name: str = Field(default=DEFAULT_EMBEDDING_MODEL)
 
-class QueryNodeConfig(BaseModel):
+class QueryNodeConfig(LLMRoutingConfig):
     llm_provider: str = Field(default="groq")
     model_name: str = Field(default="llama-3.3-70b-versatile")
     api_key: Optional[str] = Field(default=None)
+    top_k: int = Field(default=4)
+    max_concurrency: int = Field(default=4)  # Parallel LLM calls in batch mode
 
-class MCQGeneratorConfig(BaseModel):
+class MCQGeneratorConfig(LLMRoutingConfig):
     llm_provider: str = Field(default="groq")
     model_name: str = Field(default="llama-3.3-70b-versatile")
     api_key: Optional[str] = Field(default=None)
     num_questions: int = Field(default=10)
     difficulty_level: str = Field(default="medium")
 
+class QuestionBankNodeConfig(MCQGeneratorConfig):
+    difficulties: List[str] = Field(default_factory=lambda: list(DIFFICULTIES))
+
 # LLM Node with Groq Support
 class LLMNode(BaseNode):
     def __init__(self, node_id: str, name: str, config: LLMNodeConfig):
@@ -95,30 +342,30 @@ class LLMNode(BaseNode):
         self.llm = self._initialize_llm()
 
     def _initialize_llm(self):
-        providers = {
-            "groq": ChatGroq,
-            "openai": ChatOpenAI,
-            "google": ChatGoogleGenerativeAI
-        }
-        provider_class = providers.get(self.config.provider)
-        if not provider_class:
-            raise ValueError(f"Unsupported LLM provider: {self.config.provider}")
+        return build_llm_router(self.config.provider, self.config.model_name, self.config.api_key,
+                                self.config, self._create_client)
+
+    def _create_client(self, provider: str, model_name: str, api_key: Optional[str], max_retries: int):
+        provider_class = get_provider_class(provider)
 
         # Groq-specific initialization
-        if self.config.provider == "groq":
-            return ChatGroq(
-                model=self.config.model_name,
+        if provider == "groq":
+            return provider_class(
+                model=model_name,
                 temperature=self.config.temperature,
                 max_tokens=self.config.max_tokens,
-                api_key=self.config.api_key,
-                max_retries=3  # Groq-specific setting
+                api_key=api_key,
+                max_retries=max_retries,  # Groq-specific setting
+                **rate_limit_client_options(provider, model_name, api_key)
             )
         else:
             return provider_class(
-                model=self.config.model_name,
+                model=model_name,
                 temperature=self.config.temperature,
                 max_tokens=self.config.max_tokens,
-                api_key=self.config.api_key
+                api_key=api_key,
+                max_retries=max_retries,
+                **rate_limit_client_options(provider, model_name, api_key)
             )
 
     def validate_inputs(self, inputs: NodeInput) -> bool:
@@ -139,6 +386,8 @@ class LLMNode(BaseNode):
 
 # PDF Reader Node (unchanged)
 class PDFReaderNode(BaseNode):
+    large_outputs = ("documents",)
+
     def validate_inputs(self, inputs: NodeInput) -> bool:
         return "file_path" in inputs.data and os.path.exists(inputs.data["file_path"]) and "user_id" in inputs.data
 
@@ -150,7 +399,7 @@ class PDFReaderNode(BaseNode):
             )
 
         try:
-            loader = PDFMinerLoader(inputs.data["file_path"])
+            loader = _lazy("PDFMinerLoader")(inputs.data["file_path"])
             documents = loader.load()
             logger.info(f"PDF loaded with {len(documents)} pages")
             return NodeOutput(
@@ -165,14 +414,16 @@ class PDFReaderNode(BaseNode):
 
 # Vector Store Node (unchanged)
 class VectorStoreNode(BaseNode):
+    large_outputs = ("vector_store",)
+
     def __init__(self, node_id: str, name: str, config: VectorStoreNodeConfig):
         super().__init__(node_id, name)
         self.config = config
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.text_splitter = _lazy("RecursiveCharacterTextSplitter")(
             chunk_size=config.chunk_size,
             chunk_overlap=config.chunk_overlap
         )
-        self.embeddings = HuggingFaceEmbeddings(model_name=config.embedding_model_name)
+        self.embeddings = get_embeddings(config.embedding_model_name)
 
     def validate_inputs(self, inputs: NodeInput) -> bool:
         return "documents" in inputs.data and "user_id" in inputs.data
@@ -193,11 +444,10 @@ class VectorStoreNode(BaseNode):
             
             os.makedirs(persist_dir, exist_ok=True)
 
-            vector_store = Chroma.from_documents(
+            vector_store = _lazy("Chroma").from_documents(
                 documents=texts,
                 embedding=self.embeddings,
-                collection_name=collection_name,
-                persist_directory=persist_dir
+                **vector_store_location(collection_name, persist_dir)
             )
 
             logger.info(f"Vector store created with collection: {collection_name}")
@@ -225,33 +475,34 @@ class QueryNode(BaseNode):
         super().__init__(node_id, name)
         self.config = config
         self.llm = self._initialize_llm()
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self.embeddings = get_embeddings()
 
     def _initialize_llm(self):
-        providers = {
-            "groq": ChatGroq,
-            "openai": ChatOpenAI,
-            "google": ChatGoogleGenerativeAI
-        }
-        provider_class = providers.get(self.config.llm_provider)
-        if not provider_class:
-            raise ValueError(f"Unsupported LLM provider: {self.config.llm_provider}")
-
-        if self.config.llm_provider == "groq":
-            return ChatGroq(
-                model=self.config.model_name,
-                api_key=self.config.api_key,
-                max_retries=3,
-                temperature=0.1  # Lower temperature for more consistent responses
+        return build_llm_router(self.config.llm_provider, self.config.model_name, self.config.api_key,
+                                self.config, self._create_client)
+
+    def _create_client(self, provider: str, model_name: str, api_key: Optional[str], max_retries: int):
+        provider_class = get_provider_class(provider)
+
+        if provider == "groq":
+            return provider_class(
+                model=model_name,
+                api_key=api_key,
+                max_retries=max_retries,
+                temperature=0.1,  # Lower temperature for more consistent responses
+                **rate_limit_client_options(provider, model_name, api_key)
             )
         else:
             return provider_class(
-                model=self.config.model_name,
-                api_key=self.config.api_key
+                model=model_name,
+                api_key=api_key,
+                max_retries=max_retries,
+                **rate_limit_client_options(provider, model_name, api_key)
             )
 
     def validate_inputs(self, inputs: NodeInput) -> bool:
-        required_fields = ["query", "vector_store_id", "user_id"]
+        query_field = "queries" if "queries" in inputs.data else "query"
+        required_fields = [query_field, "vector_store_id", "user_id"]
         missing_fields = [field for field in required_fields if field not in inputs.data or inputs.data[field] is None]
 
         if missing_fields:
@@ -264,11 +515,42 @@ class QueryNode(BaseNode):
 
         return True
 
+    def _open_vector_store(self, collection_name: str, persist_dir: str):
+        """Open an existing collection, returning (vector_store, doc_count, error_output)."""
+        missing_error = missing_vector_store_error(collection_name, persist_dir)
+        if missing_error:
+            return None, 0, NodeOutput(success=False, error=missing_error)
+
+        try:
+            vector_store = _lazy("Chroma")(
+                embedding_function=self.embeddings,
+                **vector_store_location(collection_name, persist_dir)
+            )
+
+            try:
+                collection = vector_store._client.get_collection(vector_store._collection.name)
+                doc_count = collection.count()
+                logger.info(f"Found {doc_count} documents in collection")
+
+                if doc_count == 0:
+                    return None, 0, NodeOutput(success=False, error="Vector store exists but contains no documents")
+
+            except Exception as e:
+                return None, 0, NodeOutput(success=False, error=f"Failed to access collection: {str(e)}")
+
+        except Exception as e:
+            return None, 0, NodeOutput(success=False, error=f"Failed to initialize vector store: {str(e)}")
+
+        return vector_store, doc_count, None
+
     def run(self, inputs: NodeInput) -> NodeOutput:
         if not self.validate_inputs(inputs):
             return NodeOutput(success=False,
                               error="Missing required inputs: query, vector_store_id, user_id, or api_key")
 
+        if "queries" in inputs.data:
+            return self.run_batch(inputs)
+
         try:
             user_id = inputs.data["user_id"]
             collection_name = inputs.data["vector_store_id"]
@@ -278,35 +560,15 @@ class QueryNode(BaseNode):
 
             logger.info(f"Querying vector store: {collection_name} in {persist_dir}")
 
-            if not os.path.exists(persist_dir):
-                return NodeOutput(success=False, error=f"Vector store directory {persist_dir} does not exist")
+            vector_store, _, error_output = self._open_vector_store(collection_name, persist_dir)
+            if error_output:
+                return error_output
 
             try:
-                vector_store = Chroma(
-                    collection_name=collection_name,
-                    embedding_function=self.embeddings,
-                    persist_directory=persist_dir
-                )
+                source_documents = vector_store.similarity_search(query, k=self.config.top_k)
+                logger.info(f"Similarity search returned {len(source_documents)} results")
 
-                try:
-                    collection = vector_store._client.get_collection(collection_name)
-                    doc_count = collection.count()
-                    logger.info(f"Found {doc_count} documents in collection")
-
-                    if doc_count == 0:
-                        return NodeOutput(success=False, error="Vector store exists but contains no documents")
-
-                except Exception as e:
-                    return NodeOutput(success=False, error=f"Failed to access collection: {str(e)}")
-
-            except Exception as e:
-                return NodeOutput(success=False, error=f"Failed to initialize vector store: {str(e)}")
-
-            try:
-                test_results = vector_store.similarity_search(query, k=3)
-                logger.info(f"Similarity search returned {len(test_results)} results")
-
-                if not test_results:
+                if not source_documents:
                     broader_results = vector_store.similarity_search("document", k=5)
                     if not broader_results:
                         return NodeOutput(success=False, error="No documents found in vector store")
@@ -315,20 +577,16 @@ class QueryNode(BaseNode):
                 return NodeOutput(success=False, error=f"Similarity search failed: {str(e)}")
 
             try:
-                qa_chain = RetrievalQA.from_chain_type(
-                    llm=self.llm,
-                    chain_type="stuff",
-                    retriever=vector_store.as_retriever(search_kwargs={"k": 4}),
-                    return_source_documents=True
-                )
-
-                response = qa_chain.invoke({"query": query})
+                # Same "stuff" prompt RetrievalQA builds, sent through the provider router
+                prompt = _lazy("PROMPT_SELECTOR").get_prompt(self.llm.primary_client)
+                context = "\n\n".join(doc.page_content for doc in source_documents)
+                response = self.llm.invoke(prompt.format_prompt(context=context, question=query))
 
                 return NodeOutput(
                     data={
-                        "answer": response["result"],
-                        "sources": [doc.metadata for doc in response["source_documents"]],
-                        "source_count": len(response["source_documents"])
+                        "answer": response.content,
+                        "sources": [doc.metadata for doc in source_documents],
+                        "source_count": len(source_documents)
                     },
                     metadata={
                         "vector_store_id": collection_name,
@@ -345,36 +603,122 @@ class QueryNode(BaseNode):
             logger.error(f"Query node failed: {str(e)}")
             return NodeOutput(success=False, error=str(e))
 
+    def run_batch(self, inputs: NodeInput) -> NodeOutput:
+        """Answer every question in inputs.data["queries"] against one collection.
+
+        All questions are embedded in a single call, retrieved with one multi-query
+        Chroma search, and answered with up to config.max_concurrency LLM calls in
+        flight. Results keep the input order; a failed question gets its own error
+        instead of failing the batch.
+        """
+        try:
+            user_id = inputs.data["user_id"]
+            collection_name = inputs.data["vector_store_id"]
+            queries = list(inputs.data["queries"])
+            persist_dir = inputs.data.get("persist_directory", f"./chroma_db/{user_id}")
+
+            logger.info(f"Batch querying vector store: {collection_name} with {len(queries)} queries")
+
+            vector_store, doc_count, error_output = self._open_vector_store(collection_name, persist_dir)
+            if error_output:
+                return error_output
+
+            results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+            pending = []
+            for index, query in enumerate(queries):
+                if not isinstance(query, str) or not query.strip():
+                    results[index] = {"query": query, "success": False, "error": "Empty query"}
+                else:
+                    pending.append(index)
+
+            if pending:
+                try:
+                    query_embeddings = self.embeddings.embed_documents([queries[i] for i in pending])
+                    hits = vector_store._collection.query(
+                        query_embeddings=query_embeddings,
+                        n_results=min(self.config.top_k, doc_count),
+                        include=["documents", "metadatas"]
+                    )
+                except Exception as e:
+                    return NodeOutput(success=False, error=f"Similarity search failed: {str(e)}")
+
+                # Same prompt RetrievalQA's "stuff" chain uses for single queries
+                prompt = _lazy("PROMPT_SELECTOR").get_prompt(self.llm.primary_client)
+                prompts = [
+                    prompt.format_prompt(context="\n\n".join(hits["documents"][n]), question=queries[i])
+                    for n, i in enumerate(pending)
+                ]
+                responses = self.llm.batch(
+                    prompts,
+                    config={"max_concurrency": self.config.max_concurrency},
+                    return_exceptions=True
+                )
+
+                for n, (index, response) in enumerate(zip(pending, responses)):
+                    if isinstance(response, Exception):
+                        logger.error(f"Batch query {index} failed: {str(response)}")
+                        results[index] = {"query": queries[index], "success": False,
+                                          "error": f"Query processing failed: {str(response)}"}
+                        continue
+                    sources = hits["metadatas"][n]
+                    results[index] = {
+                        "query": queries[index],
+                        "success": True,
+                        "answer": response.content,
+                        "sources": sources,
+                        "source_count": len(sources)
+                    }
+
+            answered = sum(1 for result in results if result["success"])
+            logger.info(f"Batch query answered {answered}/{len(queries)} queries")
+
+            return NodeOutput(
+                data={
+                    "results": results,
+                    "answered_count": answered
+                },
+                metadata={
+                    "vector_store_id": collection_name,
+                    "user_id": user_id,
+                    "query_count": len(queries),
+                    "provider": self.config.llm_provider
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Batch query node failed: {str(e)}")
+            return NodeOutput(success=False, error=str(e))
+
 # MCQ Generator Node with Groq Optimization
 class MCQGeneratorNode(BaseNode):
     def __init__(self, node_id: str, name: str, config: MCQGeneratorConfig):
         super().__init__(node_id, name)
         self.config = config
         self.llm = self._initialize_llm()
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self.embeddings = get_embeddings()
 
     def _initialize_llm(self):
-        providers = {
-            "groq": ChatGroq,
-            "openai": ChatOpenAI,
-            "google": ChatGoogleGenerativeAI
-        }
-        provider_class = providers.get(self.config.llm_provider)
-        if not provider_class:
-            raise ValueError(f"Unsupported LLM provider: {self.config.llm_provider}")
-
-        if self.config.llm_provider == "groq":
-            return ChatGroq(
-                model=self.config.model_name,
-                api_key=self.config.api_key,
-                max_retries=3,
+        return build_llm_router(self.config.llm_provider, self.config.model_name, self.config.api_key,
+                                self.config, self._create_client, priority="bulk")
+
+    def _create_client(self, provider: str, model_name: str, api_key: Optional[str], max_retries: int):
+        provider_class = get_provider_class(provider)
+
+        if provider == "groq":
+            return provider_class(
+                model=model_name,
+                api_key=api_key,
+                max_retries=max_retries,
                 temperature=0.3,  # Balanced creativity for MCQ generation
-                max_tokens=1000   # Sufficient for MCQ responses
+                max_tokens=1000,  # Sufficient for MCQ responses
+                **rate_limit_client_options(provider, model_name, api_key)
             )
         else:
             return provider_class(
-                model=self.config.model_name,
-                api_key=self.config.api_key
+                model=model_name,
+                api_key=api_key,
+                max_retries=max_retries,
+                **rate_limit_client_options(provider, model_name, api_key)
             )
 
     def validate_inputs(self, inputs: NodeInput) -> bool:
@@ -392,22 +736,26 @@ class MCQGeneratorNode(BaseNode):
 
             logger.info(f"Generating MCQ questions from vector store: {collection_name} using {self.config.llm_provider}")
 
-            if not os.path.exists(persist_dir):
-                return NodeOutput(success=False, error=f"Vector store directory {persist_dir} does not exist")
+            missing_error = missing_vector_store_error(collection_name, persist_dir)
+            if missing_error:
+                return NodeOutput(success=False, error=missing_error)
 
-            vector_store = Chroma(
-                collection_name=collection_name,
+            vector_store = _lazy("Chroma")(
                 embedding_function=self.embeddings,
-                persist_directory=persist_dir
+                **vector_store_location(collection_name, persist_dir)
             )
 
             questions = []
             question_prompts = self._get_question_prompts()
+            # Question bank refills ask about random passages instead of the same top matches
+            contexts = self._sample_contexts(vector_store, self.config.num_questions) \
+                if inputs.data.get("spread_contexts") else []
 
             for i in range(self.config.num_questions):
                 try:
                     prompt = question_prompts[i % len(question_prompts)]
-                    mcq_question = self._generate_single_mcq(vector_store, prompt)
+                    context = contexts[i % len(contexts)] if contexts else None
+                    mcq_question = self._generate_single_mcq(vector_store, prompt, context)
                     if mcq_question:
                         questions.append(mcq_question)
                         logger.info(f"Generated question {i + 1}/{self.config.num_questions}")
@@ -457,7 +805,15 @@ class MCQGeneratorNode(BaseNode):
         
         return difficulty_prompts.get(self.config.difficulty_level, difficulty_prompts["medium"])
 
-    def _generate_single_mcq(self, vector_store, base_prompt):
+    def _sample_contexts(self, vector_store, count: int) -> List[str]:
+        total = vector_store._collection.count()
+        offsets = random.sample(range(total), min(count, total))
+        return [
+            vector_store._collection.get(limit=1, offset=offset, include=["documents"])["documents"][0][:1200]
+            for offset in offsets
+        ]
+
+    def _generate_single_mcq(self, vector_store, base_prompt, context: Optional[str] = None):
         try:
             # Groq-optimized MCQ generation prompt
             mcq_prompt = f"""{base_prompt}
@@ -487,8 +843,9 @@ RULES:
 - Return ONLY the JSON, no other text"""
 
             # Get relevant context (optimized for Groq)
-            docs = vector_store.similarity_search(base_prompt, k=2)
-            context = "\n".join([doc.page_content[:600] for doc in docs])  # Limit context for Groq efficiency
+            if context is None:
+                docs = vector_store.similarity_search(base_prompt, k=2)
+                context = "\n".join([doc.page_content[:600] for doc in docs])  # Limit context for Groq efficiency
             
             full_prompt = f"DOCUMENT CONTENT:\n{context}\n\n{mcq_prompt}"
 
@@ -560,10 +917,70 @@ RULES:
             logger.error(f"Error parsing MCQ response: {str(e)}")
             return None
 
+# Question bank refills queue in their own low-weight tenant per owner ("<user_id>:question_bank",
+# configurable in MCQ_TENANTS), behind interactive work but within the llm pool's caps and quotas
+QUESTION_BANK_WEIGHT = 0.25
+
+def generate_bank_questions(config: MCQGeneratorConfig, user_id: str, collection_name: str,
+                            difficulty: str, count: int) -> List[Dict[str, Any]]:
+    """Generate `count` questions for the question bank."""
+    node = MCQGeneratorNode("question_bank", "Question Bank Refill", config.model_copy(
+        update={"num_questions": count, "difficulty_level": difficulty}
+    ))
+    result = node.run(NodeInput(data={
+        "user_id": user_id,
+        "vector_store_id": collection_name,
+        "persist_directory": f"./chroma_db/{user_id}",
+        "spread_contexts": True
+    }))
+    if not result.success:
+        raise RuntimeError(result.error)
+    return result.data["mcq_questions"]
+
+def scheduled_bank_generator(config: MCQGeneratorConfig, user_id: str, collection_name: str, difficulty: str):
+    """generate(count) for the bank's filler threads, run through the scheduler's llm pool."""
+    def generate(count: int) -> List[Dict[str, Any]]:
+        return get_scheduler().run_threadsafe(
+            "llm", f"{user_id}:question_bank", generate_bank_questions,
+            config, user_id, collection_name, difficulty, count, cost=count, weight=QUESTION_BANK_WEIGHT
+        )
+    return generate
+
+# Question Bank Node: optional stage after VectorStoreNode
+class QuestionBankNode(BaseNode):
+    """Queues background generation of each difficulty's question pool and returns at once."""
+
+    def __init__(self, node_id: str, name: str, config: QuestionBankNodeConfig):
+        super().__init__(node_id, name)
+        self.config = config
+
+    def validate_inputs(self, inputs: NodeInput) -> bool:
+        return "vector_store_id" in inputs.data and "user_id" in inputs.data and self.config.api_key is not None
+
+    def run(self, inputs: NodeInput) -> NodeOutput:
+        if not self.validate_inputs(inputs):
+            return NodeOutput(success=False, error="Missing required inputs or API key")
+
+        bank = get_question_bank()
+        if bank is None:
+            return NodeOutput(data={"bank_refills": []}, metadata={"question_bank": "disabled"})
+
+        _, filler = bank
+        collection_name = inputs.data["vector_store_id"]
+        user_id = inputs.data["user_id"]
+        queued = [
+            difficulty for difficulty in self.config.difficulties
+            if filler.request_refill(user_id, collection_name, difficulty, scheduled_bank_generator(
+                self.config, user_id, collection_name, difficulty
+            ))
+        ]
+        logger.info(f"Question bank prefill queued for {collection_name}: {', '.join(queued) or 'nothing'}")
+        return NodeOutput(data={"bank_refills": queued}, metadata={"vector_store_id": collection_name})
+
 # Workflow Manager (unchanged)
 class Workflow:
     def __init__(self):
-        self.graph = nx.DiGraph()
+        self.graph = _lazy("nx").DiGraph()
         self.nodes: Dict[str, BaseNode] = {}
 
     def add_node(self, node: BaseNode):
@@ -573,31 +990,51 @@ class Workflow:
     def add_edge(self, source_id: str, target_id: str):
         self.graph.add_edge(source_id, target_id)
 
-    def execute(self, start_node_id: str, initial_inputs: NodeInput) -> Dict[str, NodeOutput]:
+    def execute(self, start_node_id: str, initial_inputs: NodeInput,
+                keep_outputs: Optional[Iterable[str]] = None) -> Dict[str, NodeOutput]:
+        """Run the graph breadth-first from `start_node_id` and return each node's output.
+
+        A node's `large_outputs` are handed to its successors as PayloadRefs and
+        released as soon as the last of them has run, rather than living until
+        the workflow ends. `keep_outputs` lists the node ids whose large outputs
+        should still be in the returned results; the rest come back without
+        them. None keeps everything, at the cost of holding it all in memory.
+        """
+        keep = None if keep_outputs is None else set(keep_outputs)
+        store = PayloadStore()
         results = {}
-        queue = [(start_node_id, initial_inputs)]
+        queue = deque([(start_node_id, initial_inputs)])
         visited = set()
 
         while queue:
-            node_id, inputs = queue.pop(0)
+            node_id, inputs = queue.popleft()
             if node_id in visited:
+                store.release(inputs.data)
                 continue
             visited.add(node_id)
 
             node = self.nodes[node_id]
             logger.info(f"Executing node {node_id}: {node.name}")
-            output = node.run(inputs)
+            try:
+                output = node.run(NodeInput(data=store.resolve(inputs.data), metadata=inputs.metadata))
+            finally:
+                store.release(inputs.data)
             results[node_id] = output
 
+            large = {key: output.data.pop(key) for key in node.large_outputs if key in output.data}
+            if keep is None or node_id in keep:
+                output.data.update(large)
+
             if output.success:
                 logger.info(f"Node {node_id} succeeded")
-                for successor_id in self.graph.successors(node_id):
-                    new_data = {**output.data}
-                    if "query" in inputs.data:
-                        new_data["query"] = inputs.data["query"]
-
-                    if "persist_directory" in output.data:
-                        new_data["persist_directory"] = output.data["persist_directory"]
+                successors = list(self.graph.successors(node_id))
+                refs = {key: store.put(node_id, key, value, len(successors))
+                        for key, value in large.items()} if successors else {}
+                for successor_id in successors:
+                    new_data = {**output.data, **refs}
+                    for key in ("query", "queries"):
+                        if key in inputs.data:
+                            new_data[key] = inputs.data[key]
 
                     new_inputs = NodeInput(
                         data=new_data,
@@ -606,11 +1043,94 @@ class Workflow:
                     queue.append((successor_id, new_inputs))
             else:
                 logger.error(f"Node {node_id} failed: {output.error}")
+            del large
 
         return results
 
+# Warm-up targets accepted in MCQ_WARMUP (comma separated), loaded in the
+# background at startup so the first request doesn't pay for them
+WARMUP_TARGETS = {
+    "groq": ["ChatGroq", "groq"],
+    "openai": ["ChatOpenAI"],
+    "google": ["ChatGoogleGenerativeAI"],
+    "pdf": ["PDFMinerLoader"],
+    "vector_store": ["Chroma", "chromadb", "RecursiveCharacterTextSplitter"],
+    "qa": ["PROMPT_SELECTOR"],
+    "workflow": ["nx"],
+    "embeddings": ["HuggingFaceEmbeddings"],  # Also loads the default embedding weights
+}
+
+_startup_report: Dict[str, Any] = {
+    "core_imports_ms": round(_CORE_IMPORTS_MS, 2),
+    "module_load_ms": None,
+    "time_to_ready_ms": None,
+    "process_uptime_at_ready_ms": None,
+    "warmup": {"targets": [], "status": "disabled", "duration_ms": None}
+}
+
+def _process_uptime_ms() -> Optional[float]:
+    # Includes interpreter startup and server imports that happen before main.py loads
+    try:
+        with open("/proc/self/stat") as stat_file:
+            start_ticks = int(stat_file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        return round((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def warm_up(targets: List[str]):
+    warmup = _startup_report["warmup"]
+    warmup.update(targets=targets, status="running")
+    start = time.perf_counter()
+    try:
+        for target in targets:
+            if target not in WARMUP_TARGETS:
+                logger.warning(f"Unknown warm-up target: {target}")
+                continue
+            for name in WARMUP_TARGETS[target]:
+                _lazy(name)
+            if target == "embeddings":
+                preload_models()
+        warmup["status"] = "done"
+    except Exception as e:
+        logger.error(f"Warm-up failed: {str(e)}")
+        warmup["status"] = f"failed: {str(e)}"
+    warmup["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+def prepare_workers(model_names: List[str]):
+    """serve.run's preload hook: import every heavy dependency and load the embedding
+    weights in the master, so forked workers share them instead of importing them again."""
+    warm_up([target for target in WARMUP_TARGETS if target != "embeddings"])
+    if model_names:
+        preload_models(model_names)
+
+def startup_report() -> Dict[str, Any]:
+    return {**_startup_report, "imports_ms": dict(_import_times_ms)}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup code
+    os.makedirs("./chroma_db", exist_ok=True)
+
+    warmup_targets = [t.strip() for t in os.environ.get("MCQ_WARMUP", "").split(",") if t.strip()]
+    warmup_task = asyncio.create_task(asyncio.to_thread(warm_up, warmup_targets)) if warmup_targets else None
+
+    # Per process, so each forked worker gets its own threads; bound to this loop so
+    # background threads (question bank refills) can queue work too
+    get_scheduler().bind_loop(asyncio.get_running_loop())
+
+    _startup_report["time_to_ready_ms"] = round((time.perf_counter() - _MODULE_START) * 1000, 2)
+    _startup_report["process_uptime_at_ready_ms"] = _process_uptime_ms()
+    logger.info(f"MCQ Generator API with Groq support started in {_startup_report['time_to_ready_ms']}ms")
+    yield
+    if warmup_task and not warmup_task.done():
+        await warmup_task
+    shutdown_scheduler()
+    shutdown_question_bank()
+
 # FastAPI App with Groq Integration
-app = FastAPI(title="MCQ Generator API with Groq", version="1.0.0")
+app = FastAPI(title="MCQ Generator API with Groq", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -621,16 +1141,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup code
-    os.makedirs("./chroma_db", exist_ok=True)
-    logger.info("MCQ Generator API with Groq support started")
-    yield
+def _quota_exceeded(error: QuotaExceededError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(error),
+                         headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))})
 
 # Upload PDF endpoint
 @app.post("/upload_pdf")
-async def upload_pdf(file: UploadFile = File(...), user_id: str = Form(...)):
+async def upload_pdf(
+    file: UploadFile = File(...),
+    user_id: str = Form(...),
+    prefill_question_bank: bool = Form(False),
+    llm_provider: str = Form("groq"),
+    api_key: Optional[str] = Form(None)
+):
     try:
         # Save uploaded file
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
@@ -653,20 +1176,38 @@ async def upload_pdf(file: UploadFile = File(...), user_id: str = Form(...)):
         workflow.add_node(vector_store)
         workflow.add_edge("pdf_reader", "vector_store")
 
+        # Optionally start generating the collection's question bank in the background
+        if prefill_question_bank and api_key:
+            bank_config = QuestionBankNodeConfig(
+                llm_provider=llm_provider,
+                model_name=DEFAULT_MODELS.get(llm_provider, "llama-3.3-70b-versatile"),
+                api_key=api_key
+            )
+            workflow.add_node(QuestionBankNode("question_bank", "Question Bank", bank_config))
+            workflow.add_edge("vector_store", "question_bank")
+
         # Execute workflow
         initial_inputs = NodeInput(data={"file_path": tmp_file_path, "user_id": user_id})
-        results = workflow.execute("pdf_reader", initial_inputs)
-
-        # Clean up
-        os.unlink(tmp_file_path)
+        # Only ids and counts are returned, so neither the pages nor the store handle are kept.
+        # Parsing and embedding run in the user's ingestion queue, costed by file size in MB.
+        try:
+            results = await get_scheduler().run(
+                "ingestion", user_id, workflow.execute, "pdf_reader", initial_inputs,
+                keep_outputs=(), cost=max(1, math.ceil(len(content) / (1024 * 1024)))
+            )
+        finally:
+            # Clean up
+            os.unlink(tmp_file_path)
 
         # Check results
         if results["vector_store"].success:
+            bank_output = results.get("question_bank")
             return {
                 "success": True,
                 "message": "PDF processed successfully",
                 "vector_store_id": results["vector_store"].data["vector_store_id"],
-                "chunk_count": results["vector_store"].data["chunk_count"]
+                "chunk_count": results["vector_store"].data["chunk_count"],
+                "question_bank_prefill": bank_output.data.get("bank_refills", []) if bank_output else []
             }
         else:
             return {
@@ -674,6 +1215,8 @@ async def upload_pdf(file: UploadFile = File(...), user_id: str = Form(...)):
                 "error": results["vector_store"].error
             }
 
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -686,8 +1229,20 @@ async def generate_mcq(
     num_questions: int = Form(10),
     difficulty: str = Form("medium"),
     llm_provider: str = Form("groq"),
-    api_key: str = Form(...)
+    api_key: str = Form(...),
+    fallback_provider: Optional[str] = Form(None),
+    fallback_api_key: Optional[str] = Form(None),
+    viewer_id: Optional[str] = Form(None),  # Who will see the questions; defaults to user_id
+    use_question_bank: bool = Form(False)
 ):
+    """Generate MCQs from the user's collection.
+
+    With use_question_bank, questions the viewer has not seen are served from the
+    bank first and generated questions come from random passages rather than the
+    best matches. Once the viewer has fewer than the bank's low watermark left, a
+    background refill of up to MCQ_QUESTION_BANK_REFILL_BATCH questions (5) runs
+    on this request's API key, so the key is billed for those extra calls too.
+    """
     try:
         logger.info(f"Generating {num_questions} MCQ questions for user {user_id} using {llm_provider}")
 
@@ -696,42 +1251,137 @@ async def generate_mcq(
             raise HTTPException(status_code=400, detail="Groq API key is required")
 
         # Set model based on provider
-        model_mapping = {
-            "groq": "llama-3.3-70b-versatile",
-            "openai": "gpt-3.5-turbo",
-            "google": "gemini-pro"
-        }
-        
-        model_name = model_mapping.get(llm_provider, "llama-3.3-70b-versatile")
+        model_name = DEFAULT_MODELS.get(llm_provider, "llama-3.3-70b-versatile")
+        viewer_id = viewer_id or user_id
+
+        # Serve what the question bank has that this viewer hasn't seen yet. Banks are per
+        # owner: only collections under ./chroma_db/{user_id}, like the generator below reads.
+        bank = get_question_bank() if use_question_bank else None
+        banked_ids, banked = await asyncio.to_thread(
+            bank[0].take, user_id, vector_store_id, difficulty, viewer_id, num_questions
+        ) if bank else ([], [])
+        missing = num_questions - len(banked)
 
         # Create MCQ generator configuration
         mcq_config = MCQGeneratorConfig(
             llm_provider=llm_provider,
             model_name=model_name,
             api_key=api_key,
-            num_questions=num_questions,
-            difficulty_level=difficulty
+            num_questions=missing,
+            difficulty_level=difficulty,
+            fallback_provider=fallback_provider,
+            fallback_api_key=fallback_api_key
         )
 
-        # Create MCQ generator node
-        mcq_generator = MCQGeneratorNode("mcq_generator", "MCQ Generator", mcq_config)
+        generated = []
+        try:
+            if missing > 0:
+                # Create MCQ generator node
+                mcq_generator = MCQGeneratorNode("mcq_generator", "MCQ Generator", mcq_config)
+
+                # Prepare inputs; with a bank, vary the passages so the viewer gets new questions
+                inputs = NodeInput(data={
+                    "user_id": user_id,
+                    "vector_store_id": vector_store_id,
+                    "persist_directory": f"./chroma_db/{user_id}",
+                    "spread_contexts": bank is not None
+                })
+
+                # Generate the rest; each question is one unit of the user's LLM share
+                result = await get_scheduler().run("llm", user_id, mcq_generator.run, inputs, cost=missing)
+
+                if not result.success and not banked:
+                    return {
+                        "success": False,
+                        "error": result.error
+                    }
+                if result.success:
+                    generated = result.data["mcq_questions"]
+                else:
+                    logger.warning(f"Serving {len(banked)} banked questions only: {result.error}")
+
+                if bank and generated:
+                    # Bank them too, as seen by this viewer, and drop any they were already served
+                    generated = await asyncio.to_thread(bank[0].add_served, user_id, vector_store_id, difficulty,
+                                                        viewer_id, generated)
+        except BaseException:
+            # Over quota, failed or cancelled: the viewer never sees the banked questions
+            if banked_ids:
+                await asyncio.to_thread(bank[0].unmark_served, viewer_id, banked_ids)
+            raise
+
+        if bank:
+            # Counting the viewer's unseen questions takes the bank's lock, which a filler may hold
+            # while it waits on another worker's write; keep that off the event loop
+            await asyncio.to_thread(bank[1].request_refill, user_id, vector_store_id, difficulty,
+                                    scheduled_bank_generator(mcq_config, user_id, vector_store_id, difficulty),
+                                    viewer_id=viewer_id)
+
+        questions = banked + generated
+        return {
+            "success": True,
+            "questions": questions,
+            "count": len(questions),
+            "from_question_bank": len(banked),
+            "vector_store_id": vector_store_id,
+            "provider": llm_provider,
+            "model": model_name
+        }
+
+    except HTTPException:
+        raise
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
+    except Exception as e:
+        logger.error(f"MCQ generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Query endpoint with Groq support
+@app.post("/query")
+async def query_document(
+    user_id: str = Form(...),
+    vector_store_id: str = Form(...),
+    query: str = Form(...),
+    api_key: str = Form(...),
+    llm_provider: str = Form("groq"),
+    fallback_provider: Optional[str] = Form(None),
+    fallback_api_key: Optional[str] = Form(None)
+):
+    try:
+        logger.info(f"Processing query for user {user_id} using {llm_provider}")
+
+        # Set model based on provider
+        model_name = DEFAULT_MODELS.get(llm_provider, "llama-3.3-70b-versatile")
+
+        # Create query configuration
+        query_config = QueryNodeConfig(
+            llm_provider=llm_provider,
+            model_name=model_name,
+            api_key=api_key,
+            fallback_provider=fallback_provider,
+            fallback_api_key=fallback_api_key
+        )
+
+        # Create query node
+        query_node = QueryNode("query", "Query", query_config)
 
         # Prepare inputs
         inputs = NodeInput(data={
             "user_id": user_id,
             "vector_store_id": vector_store_id,
+            "query": query,
             "persist_directory": f"./chroma_db/{user_id}"
         })
 
-        # Generate MCQ questions
-        result = mcq_generator.run(inputs)
+        # Execute query
+        result = await get_scheduler().run("llm", user_id, query_node.run, inputs)
 
         if result.success:
             return {
                 "success": True,
-                "questions": result.data["mcq_questions"],
-                "count": result.data["question_count"],
-                "vector_store_id": vector_store_id,
+                "answer": result.data["answer"],
+                "sources": result.data["sources"],
+                "source_count": result.data["source_count"],
                 "provider": llm_provider,
                 "model": model_name
             }
@@ -741,58 +1391,55 @@ async def generate_mcq(
                 "error": result.error
             }
 
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
     except Exception as e:
-        logger.error(f"MCQ generation failed: {str(e)}")
+        logger.error(f"Query failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Query endpoint with Groq support
-@app.post("/query")
-async def query_document(
+# Batch query endpoint: many questions against one collection
+@app.post("/query_batch")
+async def query_document_batch(
     user_id: str = Form(...),
     vector_store_id: str = Form(...),
-    query: str = Form(...),
+    queries: List[str] = Form(...),
     api_key: str = Form(...),
-    llm_provider: str = Form("groq")
+    llm_provider: str = Form("groq"),
+    max_concurrency: int = Form(4),
+    fallback_provider: Optional[str] = Form(None),
+    fallback_api_key: Optional[str] = Form(None)
 ):
     try:
-        logger.info(f"Processing query for user {user_id} using {llm_provider}")
+        logger.info(f"Processing {len(queries)} batch queries for user {user_id} using {llm_provider}")
 
-        # Set model based on provider
-        model_mapping = {
-            "groq": "llama-3.3-70b-versatile",
-            "openai": "gpt-3.5-turbo",
-            "google": "gemini-pro"
-        }
-        
-        model_name = model_mapping.get(llm_provider, "llama-3.3-70b-versatile")
+        model_name = DEFAULT_MODELS.get(llm_provider, "llama-3.3-70b-versatile")
 
-        # Create query configuration
         query_config = QueryNodeConfig(
             llm_provider=llm_provider,
             model_name=model_name,
-            api_key=api_key
+            api_key=api_key,
+            max_concurrency=max(1, max_concurrency),
+            fallback_provider=fallback_provider,
+            fallback_api_key=fallback_api_key
         )
 
-        # Create query node
         query_node = QueryNode("query", "Query", query_config)
 
-        # Prepare inputs
         inputs = NodeInput(data={
             "user_id": user_id,
             "vector_store_id": vector_store_id,
-            "query": query,
+            "queries": queries,
             "persist_directory": f"./chroma_db/{user_id}"
         })
 
-        # Execute query
-        result = query_node.run(inputs)
+        result = await get_scheduler().run("llm", user_id, query_node.run, inputs, cost=len(queries))
 
         if result.success:
             return {
                 "success": True,
-                "answer": result.data["answer"],
-                "sources": result.data["sources"],
-                "source_count": result.data["source_count"],
+                "results": result.data["results"],
+                "count": len(result.data["results"]),
+                "answered_count": result.data["answered_count"],
                 "provider": llm_provider,
                 "model": model_name
             }
@@ -802,8 +1449,10 @@ async def query_document(
                 "error": result.error
             }
 
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
     except Exception as e:
-        logger.error(f"Query failed: {str(e)}")
+        logger.error(f"Batch query failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Health check endpoint
@@ -812,9 +1461,20 @@ async def health_check():
     return {
         "status": "healthy", 
         "service": "MCQ Generator API with Groq",
-        "supported_providers": ["groq", "openai", "google"],
+        "supported_providers": list(LLM_PROVIDERS),
         "default_provider": "groq",
-        "default_model": "llama-3.3-70b-versatile"
+        "default_model": "llama-3.3-70b-versatile",
+        "startup": startup_report()
+    }
+
+# Runtime metrics endpoint
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "llm_routes": route_metrics(),
+        "rate_limits": rate_limit_metrics(),
+        "tenants": tenant_metrics(),
+        "question_bank": question_bank_metrics()
     }
 
 # Model information endpoint
@@ -854,7 +1514,17 @@ async def get_available_models():
         ]
     }
 
+_startup_report["module_load_ms"] = round((time.perf_counter() - _MODULE_START) * 1000, 2)
+
 if __name__ == "__main__":
-    import uvicorn
-    logger.info("Starting MCQ Generator API with Groq support...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    from serve import ServeConfig, run
+
+    serve_config = ServeConfig.from_env()
+    if serve_config.workers > 1:
+        # Preload in this process and fork workers that share the model pages
+        check_worker_storage(serve_config.workers)
+        run(app, serve_config, preload=prepare_workers)
+    else:
+        import uvicorn
+        logger.info("Starting MCQ Generator API with Groq support...")
+        uvicorn.run(app, host=serve_config.host, port=serve_config.port)
\ No newline at end of file
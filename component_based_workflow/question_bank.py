@@ -0,0 +1,329 @@
+# component_based_workflow/question_bank.py - Pre-generated MCQs per owner, collection and difficulty, served without repeats
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+_OPTION_KEYS = ("option_a", "option_b", "option_c", "option_d")
+_CATCH_ALL_OPTION = re.compile(r"\b(all|none) of the above\b", re.IGNORECASE)
+
+
+class QuestionBankConfig(BaseModel):
+    enabled: bool = Field(default=True)       # Available to requests that opt in; they never use it otherwise
+    path: str = Field(default="./chroma_db/question_bank.sqlite3")
+    target_size: int = Field(default=20)      # Questions kept ready per collection and difficulty
+    low_watermark: int = Field(default=5)     # Refill once fewer unseen questions than this remain
+    refill_batch: int = Field(default=5)      # Questions per generation call; a viewer's refill makes one
+    workers: int = Field(default=1)           # Background generation threads
+
+    @classmethod
+    def from_env(cls) -> "QuestionBankConfig":
+        env_fields = {
+            "enabled": "MCQ_QUESTION_BANK",
+            "path": "MCQ_QUESTION_BANK_PATH",
+            "target_size": "MCQ_QUESTION_BANK_TARGET",
+            "low_watermark": "MCQ_QUESTION_BANK_LOW_WATERMARK",
+            "refill_batch": "MCQ_QUESTION_BANK_REFILL_BATCH",
+            "workers": "MCQ_QUESTION_BANK_WORKERS",
+        }
+        values: Dict[str, Any] = {
+            field: os.environ[name] for field, name in env_fields.items() if os.environ.get(name)
+        }
+        return cls(**values)
+
+
+def validate_mcq(question: Dict[str, Any]) -> bool:
+    """Stricter than the generator's parse: real text, four distinct options, no catch-alls."""
+    text = str(question.get("question") or "").strip()
+    options = [str(question.get(key) or "").strip() for key in _OPTION_KEYS]
+    if len(text) < 10 or not all(options):
+        return False
+    if len({option.lower() for option in options}) != len(options):
+        return False
+    if any(_CATCH_ALL_OPTION.search(option) for option in options):
+        return False
+    return question.get("correct_answer") in ("A", "B", "C", "D")
+
+
+def _fingerprint(question: Dict[str, Any]) -> str:
+    normalized = re.sub(r"\W+", " ", str(question["question"]).lower()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class QuestionBank:
+    """SQLite store of validated questions plus which viewer has been served which.
+
+    Questions are banked per owner - the user whose ./chroma_db/{owner} holds the
+    collection - so knowing another user's collection id reveals nothing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Workers of a multi-process server share the file; wait out each other's write locks
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (owner, collection, difficulty, fingerprint)
+            );
+            CREATE TABLE IF NOT EXISTS served (
+                viewer_id TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                served_at REAL NOT NULL,
+                PRIMARY KEY (viewer_id, question_id)
+            );
+            CREATE INDEX IF NOT EXISTS questions_by_pool ON questions (owner, collection, difficulty);
+        """)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def add(self, owner: str, collection: str, difficulty: str, questions: List[Dict[str, Any]]) -> List[int]:
+        """Store the valid, not-yet-banked questions; returns the new rows' ids."""
+        ids = []
+        now = time.time()
+        with self._transaction():
+            for question in questions:
+                if not validate_mcq(question):
+                    continue
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO questions (owner, collection, difficulty, fingerprint, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (owner, collection, difficulty, _fingerprint(question), json.dumps(question), now)
+                )
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+        return ids
+
+    def take(self, owner: str, collection: str, difficulty: str, viewer_id: str,
+             count: int) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """Up to `count` random questions `viewer_id` has not been served, marked as served.
+
+        Returns their ids too, for unmark_served() if they never reach the viewer.
+        """
+        with self._transaction():
+            rows = self._connection.execute(
+                "SELECT id, payload FROM questions WHERE owner = ? AND collection = ? AND difficulty = ? "
+                "AND id NOT IN (SELECT question_id FROM served WHERE viewer_id = ?) "
+                "ORDER BY RANDOM() LIMIT ?",
+                (owner, collection, difficulty, viewer_id, count)
+            ).fetchall()
+            self._mark_served(viewer_id, [row[0] for row in rows])
+        return [row[0] for row in rows], [json.loads(payload) for _, payload in rows]
+
+    def unmark_served(self, viewer_id: str, question_ids: List[int]):
+        """Return questions taken for a request that failed to the viewer's unseen pool."""
+        if not question_ids:
+            return
+        with self._transaction():
+            self._connection.executemany(
+                "DELETE FROM served WHERE viewer_id = ? AND question_id = ?",
+                [(viewer_id, question_id) for question_id in question_ids]
+            )
+
+    def add_served(self, owner: str, collection: str, difficulty: str, viewer_id: str,
+                   questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bank freshly generated questions as served to `viewer_id`, dropping ones they have seen.
+
+        Questions that fail validation are passed through without being banked.
+        """
+        fresh = []
+        now = time.time()
+        with self._transaction():
+            for question in questions:
+                if not validate_mcq(question):
+                    fresh.append(question)
+                    continue
+                fingerprint = _fingerprint(question)
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO questions (owner, collection, difficulty, fingerprint, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (owner, collection, difficulty, fingerprint, json.dumps(question), now)
+                )
+                question_id = self._connection.execute(
+                    "SELECT id FROM questions WHERE owner = ? AND collection = ? AND difficulty = ? AND fingerprint = ?",
+                    (owner, collection, difficulty, fingerprint)
+                ).fetchone()[0]
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO served (viewer_id, question_id, served_at) VALUES (?, ?, ?)",
+                    (viewer_id, question_id, now)
+                )
+                if cursor.rowcount:
+                    fresh.append(question)
+        return fresh
+
+    def _mark_served(self, viewer_id: str, question_ids: List[int]):
+        now = time.time()
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO served (viewer_id, question_id, served_at) VALUES (?, ?, ?)",
+            [(viewer_id, question_id, now) for question_id in question_ids]
+        )
+
+    def available(self, owner: str, collection: str, difficulty: str, viewer_id: Optional[str] = None) -> int:
+        """Questions banked for the pool, or only those `viewer_id` has not seen yet."""
+        with self._lock:
+            if viewer_id is None:
+                row = self._connection.execute(
+                    "SELECT COUNT(*) FROM questions WHERE owner = ? AND collection = ? AND difficulty = ?",
+                    (owner, collection, difficulty)
+                ).fetchone()
+            else:
+                row = self._connection.execute(
+                    "SELECT COUNT(*) FROM questions WHERE owner = ? AND collection = ? AND difficulty = ? "
+                    "AND id NOT IN (SELECT question_id FROM served WHERE viewer_id = ?)",
+                    (owner, collection, difficulty, viewer_id)
+                ).fetchone()
+        return row[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            questions = self._connection.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+            collections = self._connection.execute(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT owner, collection FROM questions)"
+            ).fetchone()[0]
+            served = self._connection.execute("SELECT COUNT(*) FROM served").fetchone()[0]
+        return {"questions": questions, "collections": collections, "served": served}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+# Bound to one owner, collection and difficulty: generate(count) returns freshly parsed questions
+Generator = Callable[[int], List[Dict[str, Any]]]
+
+
+class QuestionBankFiller:
+    """Background refills, at most one in flight per owner, collection and difficulty."""
+
+    def __init__(self, bank: QuestionBank, config: QuestionBankConfig):
+        self.bank = bank
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=max(1, config.workers), thread_name_prefix="question-bank")
+        self._in_flight: set = set()
+        self._lock = threading.Lock()
+        self.refills = 0
+        self.generated = 0
+        self.failed = 0
+
+    def request_refill(self, owner: str, collection: str, difficulty: str, generate: Generator,
+                       viewer_id: Optional[str] = None) -> bool:
+        """Queue generation towards `target_size` questions; False if nothing was queued.
+
+        Without `viewer_id` (prefill after ingestion) the pool is topped up to
+        target. With it, a refill happens only once that viewer has fewer than
+        `low_watermark` unseen questions left, and generates one `refill_batch`:
+        the requesting user's key pays for it, so it stays small.
+        """
+        key: Tuple[str, str, str] = (owner, collection, difficulty)
+        available = self.bank.available(owner, collection, difficulty, viewer_id)
+        if viewer_id is not None and available >= self.config.low_watermark:
+            return False
+        if available >= self.config.target_size:
+            return False
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+        self.executor.submit(self._refill, key, generate, viewer_id)
+        return True
+
+    def _refill(self, key: Tuple[str, str, str], generate: Generator, viewer_id: Optional[str]):
+        owner, collection, difficulty = key
+        try:
+            # In batches, stopping early if the model only repeats questions already banked
+            missing = self.config.target_size - self.bank.available(owner, collection, difficulty, viewer_id)
+            if viewer_id is not None:
+                missing = min(missing, self.config.refill_batch)
+            while missing > 0:
+                count = min(missing, self.config.refill_batch)
+                added = self.bank.add(owner, collection, difficulty, generate(count))
+                self.refills += 1
+                self.generated += len(added)
+                logger.info(f"Question bank refill for {owner}/{collection}/{difficulty}: {len(added)} of {count} kept")
+                if not added:
+                    break
+                missing -= len(added)
+        except CancelledError:
+            logger.info(f"Question bank refill for {owner}/{collection}/{difficulty} cancelled at shutdown")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Question bank refill for {owner}/{collection}/{difficulty} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = sorted("/".join(key) for key in self._in_flight)
+        return {"refills": self.refills, "generated": self.generated, "failed": self.failed, "in_flight": in_flight}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_bank: Optional[QuestionBank] = None
+_filler: Optional[QuestionBankFiller] = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank() -> Optional[Tuple[QuestionBank, QuestionBankFiller]]:
+    """The process's bank and filler, or None when MCQ_QUESTION_BANK disables it."""
+    global _bank, _filler
+    with _bank_lock:
+        if _bank is None:
+            config = QuestionBankConfig.from_env()
+            if not config.enabled:
+                return None
+            _bank = QuestionBank(config.path)
+            _filler = QuestionBankFiller(_bank, config)
+        return _bank, _filler
+
+
+def shutdown_question_bank():
+    global _bank, _filler
+    with _bank_lock:
+        if _filler is not None:
+            _filler.shutdown()
+        if _bank is not None:
+            _bank.close()
+        _bank, _filler = None, None
+
+
+def question_bank_metrics() -> Dict[str, Any]:
+    with _bank_lock:
+        if _bank is None:
+            return {}
+        return {**_bank.stats(), "filler": _filler.snapshot()}
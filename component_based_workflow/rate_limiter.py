@@ -0,0 +1,358 @@
+# component_based_workflow/rate_limiter.py - Shared request/token rate limiting per LLM provider and model
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Starting limits per provider until response headers say otherwise. Override per
+# "provider" or "provider:model" with MCQ_RATE_LIMITS='{"groq": {"rpm": 30, "tpm": 12000}}'.
+# Providers enforce these per API key, so each key gets its own buckets; calls made
+# with the server's own key (none in the request) all share one set. Buckets live in
+# one process, so with N forked workers (MCQ_RATE_LIMIT_WORKERS, set by serve.run)
+# each worker gets 1/N of every limit, including limits read from response headers.
+DEFAULT_LIMITS = {
+    "groq": {"rpm": 30, "tpm": 12000},
+    "openai": {"rpm": 500, "tpm": 200000},
+    "google": {"rpm": 60, "tpm": 1000000},
+}
+FALLBACK_LIMITS = {"rpm": 60, "tpm": 100000}
+
+# Queue ordering: a bulk request is served as if it had arrived this many seconds
+# later than it did, so interactive work goes first but bulk work cannot starve.
+PRIORITY_DELAYS = {
+    "interactive": 0.0,
+    "bulk": 5.0,
+}
+
+DEFAULT_COMPLETION_TOKENS = 512
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from header values such as "30", "7.66s", "2m59.56s" or "120ms"."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def estimate_tokens(prompt: Any, max_tokens: Optional[int] = None) -> int:
+    text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+    # ~4 characters per token for English text, plus the completion budget
+    return len(text) // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def percentile(ordered: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank `pct` (0-100) percentile of already sorted samples; None if there are none."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100.0)))]
+
+
+def latency_stats(samples: Iterable[float], percentiles: Iterable[float] = (50, 95, 99)) -> Dict[str, float]:
+    """Sample count and percentiles in ms, keyed "p95_ms" and so on ("max_ms" for 100)."""
+    ordered = sorted(samples)
+    stats: Dict[str, float] = {"count": len(ordered)}
+    for pct in percentiles:
+        value = percentile(ordered, pct)
+        stats["max_ms" if pct == 100 else f"p{pct:g}_ms"] = round(value * 1000, 2) if value is not None else 0.0
+    return stats
+
+
+def worker_count() -> int:
+    """Server processes sharing each provider limit; 1 unless serve.run forked workers."""
+    try:
+        return max(1, int(os.environ.get("MCQ_RATE_LIMIT_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def credential_id(api_key: Optional[str]) -> str:
+    """Short, non-reversible id for an API key, so per-key state never holds the key itself."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12] if api_key else ""
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(error).__name__ or "429" in str(error)
+
+
+def error_headers(error: BaseException) -> Dict[str, str]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    return {name.lower(): value for name, value in headers.items()} if headers else {}
+
+
+def response_headers(response: Any) -> Dict[str, str]:
+    metadata = getattr(response, "response_metadata", None) or {}
+    return {name.lower(): value for name, value in (metadata.get("headers") or {}).items()}
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        missing = amount - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class ProviderLimiter:
+    """Requests/min and tokens/min buckets with a fair priority queue in front.
+
+    Callers await acquire(); when both buckets have room and nobody is queued
+    they go straight through, otherwise they wait in order of arrival (offset by
+    PRIORITY_DELAYS) instead of being sent to the provider to collect a 429.
+    Must be used from a single event loop - the LLM router's.
+    """
+
+    def __init__(self, key: str, requests_per_minute: float, tokens_per_minute: float, workers: int = 1):
+        self.key = key
+        self.workers = workers  # Processes sharing the provider's limit; header limits are split between them
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self._queue: List[Any] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._backoff = 1.0
+
+        self.granted = 0
+        self.queued = 0
+        self.throttle_events = 0
+        self.header_updates = 0
+        self.wait_times: Dict[str, Deque[float]] = {priority: deque(maxlen=500) for priority in PRIORITY_DELAYS}
+
+    def _try_take(self, tokens: float, now: float) -> bool:
+        tokens = min(tokens, self.tokens.capacity)  # The capacity may have shrunk from headers
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        if now < self.blocked_until or self.requests.tokens < 1 or self.tokens.tokens < tokens:
+            return False
+        self.requests.tokens -= 1
+        self.tokens.tokens -= tokens
+        return True
+
+    def _time_until(self, tokens: float, now: float) -> float:
+        tokens = min(tokens, self.tokens.capacity)
+        return max(self.blocked_until - now, self.requests.time_until(1), self.tokens.time_until(tokens), 0.01)
+
+    def _dispatch(self):
+        self._timer = None
+        now = time.monotonic()
+        while self._queue:
+            _, _, tokens, future = self._queue[0]
+            if future.done():  # Caller gave up while queued
+                heapq.heappop(self._queue)
+                continue
+            if not self._try_take(tokens, now):
+                self._timer = asyncio.get_running_loop().call_later(self._time_until(tokens, now), self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            future.set_result(None)
+
+    def _redispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+
+    async def acquire(self, tokens: int, priority: str = "interactive") -> float:
+        """Wait for capacity for one request of `tokens` tokens; returns seconds waited."""
+        start = time.monotonic()
+        if not self._queue and self._try_take(tokens, start):
+            self._record_wait(priority, 0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        order = start + PRIORITY_DELAYS.get(priority, 0.0)
+        heapq.heappush(self._queue, (order, next(self._sequence), tokens, future))
+        self.queued += 1
+        if self._timer is None:
+            self._dispatch()
+        await future
+
+        waited = time.monotonic() - start
+        self._record_wait(priority, waited)
+        return waited
+
+    def _record_wait(self, priority: str, waited: float):
+        self.granted += 1
+        self.wait_times.setdefault(priority, deque(maxlen=500)).append(waited)
+
+    def record_response(self, response: Any, estimated_tokens: int):
+        """Charge or refund the difference between estimated and reported token usage."""
+        self._backoff = 1.0
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("total_tokens"):
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + estimated_tokens - usage["total_tokens"])
+        self.update_from_headers(response_headers(response))
+
+    def record_throttle(self, headers: Dict[str, str]):
+        """A 429 came back: stop sending until the provider's reset time (or a growing backoff)."""
+        self.throttle_events += 1
+        now = time.monotonic()
+        retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after is None:
+            if now < self.blocked_until:
+                # Calls already in flight when the pause began; don't escalate for each of them
+                return
+            retry_after = self._backoff
+            self._backoff = min(self._backoff * 2, 60.0)
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+        logger.warning(f"Rate limited by {self.key}; pausing {retry_after:.2f}s")
+        self.update_from_headers(headers)
+
+    def update_from_headers(self, headers: Dict[str, str]):
+        if not any(name.startswith("x-ratelimit-") for name in headers):
+            return
+        self.header_updates += 1
+        now = time.monotonic()
+
+        # Only the token limit is reliably per minute; request limits may be per day
+        token_limit = headers.get("x-ratelimit-limit-tokens")
+        if token_limit and token_limit.isdigit():
+            self.tokens.capacity = float(token_limit) / self.workers
+
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None or not remaining.isdigit():
+                continue
+            bucket.refill(now)
+            bucket.tokens = min(bucket.tokens, float(remaining))
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if int(remaining) == 0 and reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+        self._redispatch()
+
+    def idle(self) -> bool:
+        """Nothing queued and no pause in force: dropping this limiter loses nothing."""
+        return time.monotonic() >= self.blocked_until and not any(not future.done() for *_, future in self._queue)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "queue_depth": sum(1 for *_, future in list(self._queue) if not future.done()),
+            "granted": self.granted,
+            "queued": self.queued,
+            "throttle_events": self.throttle_events,
+            "header_updates": self.header_updates,
+            "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            "queue_wait": {priority: latency_stats(list(samples), (50, 95, 100))
+                           for priority, samples in self.wait_times.items()},
+        }
+
+
+# One limiter per provider, model and API key. Keys come from requests, so idle
+# limiters beyond the MAX_LIMITERS most recently used are dropped; a key seen again
+# starts over from the configured limits.
+MAX_LIMITERS = 1024
+_limiters: "OrderedDict[str, ProviderLimiter]" = OrderedDict()
+_limiters_lock = threading.Lock()
+
+
+def _configured_limits(provider: str, model: str) -> Dict[str, float]:
+    overrides = {}
+    if os.environ.get("MCQ_RATE_LIMITS"):
+        try:
+            overrides = json.loads(os.environ["MCQ_RATE_LIMITS"])
+        except json.JSONDecodeError as e:
+            logger.error(f"Ignoring invalid MCQ_RATE_LIMITS: {str(e)}")
+    return {
+        **FALLBACK_LIMITS,
+        **DEFAULT_LIMITS.get(provider, {}),
+        **overrides.get(provider, {}),
+        **overrides.get(f"{provider}:{model}", {}),
+    }
+
+
+def _limiter_key(provider: str, model: str, credential: str) -> str:
+    key = f"{provider}:{model}"
+    return f"{key}#{credential}" if credential else key
+
+
+def get_limiter(provider: str, model: str, credential: str = "") -> ProviderLimiter:
+    """The limiter for one provider, model and credential_id() of the API key."""
+    key = _limiter_key(provider, model, credential)
+    with _limiters_lock:
+        if key in _limiters:
+            _limiters.move_to_end(key)
+        else:
+            limits = _configured_limits(provider, model)
+            workers = worker_count()
+            _limiters[key] = ProviderLimiter(key, limits["rpm"] / workers, limits["tpm"] / workers, workers)
+            _evict_idle_limiters(key)
+        return _limiters[key]
+
+
+def _evict_idle_limiters(keep: str):
+    # Oldest first; busy limiters stay even past the cap, since their callers still need them
+    excess = len(_limiters) - MAX_LIMITERS
+    idle = [key for key, limiter in _limiters.items() if key != keep and limiter.idle()]
+    for key in idle[:max(excess, 0)]:
+        del _limiters[key]
+
+
+def configure_limiter(provider: str, model: str, requests_per_minute: float, tokens_per_minute: float,
+                      credential: str = ""):
+    key = _limiter_key(provider, model, credential)
+    with _limiters_lock:
+        _limiters[key] = ProviderLimiter(key, requests_per_minute, tokens_per_minute)
+        _limiters.move_to_end(key)
+        _evict_idle_limiters(key)
+        return _limiters[key]
+
+
+def response_header_hook(provider: str, model: str, credential: str = ""):
+    """httpx response hook passing x-ratelimit-* headers to the route's limiter.
+
+    For clients such as ChatGroq that drop response headers before the
+    response reaches the router. Runs on the router's event loop, like the
+    limiter itself.
+    """
+    async def hook(response):
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        if response.status_code != 429:  # The router hands 429s to record_throttle
+            get_limiter(provider, model, credential).update_from_headers(headers)
+
+    return hook
+
+
+def rate_limit_metrics() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.snapshot() for key, limiter in sorted(limiters.items())}
+
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,116 @@
+# component_based_workflow/serve.py - Multi-process serving with preloaded, copy-on-write shared models
+
+import gc
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class ServeConfig(BaseModel):
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8000)
+    workers: int = Field(default=1)
+    max_requests: int = Field(default=0)          # Recycle a worker after N requests (0 = never)
+    max_requests_jitter: int = Field(default=0)   # Spread recycling so workers don't restart together
+    graceful_timeout: int = Field(default=30)     # Seconds a stopping worker may drain in-flight requests
+    timeout: int = Field(default=120)             # Seconds before a silent worker is killed and replaced
+    keepalive: int = Field(default=5)
+    preload_models: List[str] = Field(default_factory=lambda: ["sentence-transformers/all-MiniLM-L6-v2"])
+
+    @classmethod
+    def from_env(cls) -> "ServeConfig":
+        env_fields = {
+            "host": "MCQ_HOST",
+            "port": "MCQ_PORT",
+            "workers": "MCQ_WORKERS",
+            "max_requests": "MCQ_MAX_REQUESTS",
+            "max_requests_jitter": "MCQ_MAX_REQUESTS_JITTER",
+            "graceful_timeout": "MCQ_GRACEFUL_TIMEOUT",
+            "timeout": "MCQ_WORKER_TIMEOUT",
+            "keepalive": "MCQ_KEEPALIVE",
+        }
+        values: Dict[str, Any] = {
+            field: os.environ[name] for field, name in env_fields.items() if os.environ.get(name)
+        }
+        if os.environ.get("MCQ_PRELOAD_MODELS") is not None:
+            values["preload_models"] = [
+                name.strip() for name in os.environ["MCQ_PRELOAD_MODELS"].split(",") if name.strip()
+            ]
+        return cls(**values)
+
+
+def _post_fork(server, worker):
+    # Each worker gets an equal share of the cores for torch's intra-op thread pool
+    # instead of every worker sizing its pool to the whole machine.
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, server.cfg.workers)))
+    logger.info(f"Worker {worker.pid} forked from preloaded master")
+
+
+def _load_gunicorn():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as e:
+        raise RuntimeError("Multi-worker mode requires gunicorn: pip install gunicorn") from e
+    return BaseApplication
+
+
+def run(app, config: ServeConfig, preload: Optional[Callable[[List[str]], None]] = None):
+    """Serve `app` with `config.workers` forked uvicorn workers.
+
+    `preload` is called in the master with config.preload_models before any
+    worker exists, so the model weights are mapped once and shared
+    copy-on-write by every worker (including ones forked later to replace
+    recycled workers). Only import modules and load weights here; running
+    inference or opening connections in the master would create thread pools
+    and sockets that are not safe to fork.
+    """
+    BaseApplication = _load_gunicorn()
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{config.host}:{config.port}",
+                "workers": config.workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "max_requests": config.max_requests,
+                "max_requests_jitter": config.max_requests_jitter,
+                "graceful_timeout": config.graceful_timeout,
+                "timeout": config.timeout,
+                "keepalive": config.keepalive,
+                "post_fork": _post_fork,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    # Rate limiter buckets are per process; each forked worker takes its share of every provider limit
+    os.environ["MCQ_RATE_LIMIT_WORKERS"] = str(config.workers)
+
+    if preload:
+        preload(config.preload_models)
+
+    # Move everything allocated so far out of the collector's reach: a GC pass in a
+    # worker would otherwise write to these objects' headers and un-share their pages.
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Starting {config.workers} workers on {config.host}:{config.port}")
+    PreloadedApplication().run()
+
+
+if __name__ == "__main__":
+    from main import app, check_worker_storage, prepare_workers
+
+    serve_config = ServeConfig.from_env()
+    check_worker_storage(serve_config.workers)
+    run(app, serve_config, preload=prepare_workers)
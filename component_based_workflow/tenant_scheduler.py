@@ -0,0 +1,274 @@
+# component_based_workflow/tenant_scheduler.py - Per-user fair queues, concurrency caps and quotas
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+from rate_limiter import TokenBucket, latency_stats
+
+logger = logging.getLogger(__name__)
+
+# Work pools and their limits. Override with MCQ_TENANTS, e.g.
+# '{"pools": {"llm": {"max_concurrency": 32}}, "tenants": {"user_1": {"weight": 2, "llm": {"max_queued": 100}}}}'
+#   max_concurrency   threads for the whole pool
+#   tenant_concurrency  jobs one user may have running at once
+#   max_queued        jobs one user may have waiting; more are rejected
+#   units_per_minute  work units (pages, questions, queries...) per user per minute; None = unlimited
+DEFAULT_POOLS = {
+    "ingestion": {"max_concurrency": 2, "tenant_concurrency": 1, "max_queued": 5, "units_per_minute": None},
+    "llm": {"max_concurrency": 16, "tenant_concurrency": 4, "max_queued": 50, "units_per_minute": None},
+}
+
+# Tenants with nothing queued or running for this long are forgotten
+TENANT_IDLE_TTL = 600.0
+
+
+class QuotaExceededError(RuntimeError):
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Job:
+    __slots__ = ("cost", "start_tag", "sequence", "future", "enqueued_at")
+
+    def __init__(self, cost: float, start_tag: float, sequence: int, future: asyncio.Future):
+        self.cost = cost
+        self.start_tag = start_tag
+        self.sequence = sequence
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class _TenantState:
+    def __init__(self, weight: float, limits: Dict[str, Any]):
+        self.weight = max(weight, 0.01)
+        self.limits = limits
+        self.queue: Deque[_Job] = deque()
+        self.running = 0
+        self.last_finish_tag = 0.0
+        self.last_active = time.monotonic()
+        self.units = TokenBucket(limits["units_per_minute"]) if limits.get("units_per_minute") else None
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait: Deque[float] = deque(maxlen=500)
+        self.latency: Deque[float] = deque(maxlen=500)
+
+
+class TenantPool:
+    """Start-time fair queueing across users, for one kind of work.
+
+    Each job gets a virtual start tag: the later of the pool's virtual time and
+    its user's previous finish tag. Its finish tag adds cost / weight. The
+    waiting job with the smallest start tag runs next, provided its user is
+    under `tenant_concurrency`. So a user who queues 200 questions' worth of
+    work is served in proportion to their weight, not ahead of everyone who
+    arrives after them. Must be used from a single event loop.
+    """
+
+    def __init__(self, name: str, limits: Dict[str, Any], tenant_overrides: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.limits = limits
+        self.tenant_overrides = tenant_overrides or {}
+        self.executor = ThreadPoolExecutor(max_workers=limits["max_concurrency"], thread_name_prefix=f"tenant-{name}")
+        self.virtual_time = 0.0
+        self.running = 0
+        self._sequence = itertools.count()
+        self.tenants: Dict[str, _TenantState] = {}
+
+    def _tenant(self, tenant_id: str, weight: float = 1.0) -> _TenantState:
+        if tenant_id not in self.tenants:
+            override = self.tenant_overrides.get(tenant_id, {})
+            limits = {**self.limits, **override.get(self.name, {})}
+            self.tenants[tenant_id] = _TenantState(override.get("weight", weight), limits)
+        return self.tenants[tenant_id]
+
+    def _check_quota(self, tenant_id: str, tenant: _TenantState, cost: float):
+        if sum(1 for job in tenant.queue if not job.future.done()) >= tenant.limits["max_queued"]:
+            tenant.rejected += 1
+            raise QuotaExceededError(
+                f"Too many queued {self.name} requests for user {tenant_id} (limit {tenant.limits['max_queued']})"
+            )
+        if tenant.units is not None:
+            now = time.monotonic()
+            tenant.units.refill(now)
+            needed = min(cost, tenant.units.capacity)
+            if tenant.units.tokens < needed:
+                tenant.rejected += 1
+                raise QuotaExceededError(
+                    f"{self.name} quota of {tenant.units.capacity:g} units/minute exceeded for user {tenant_id}",
+                    retry_after=tenant.units.time_until(needed)
+                )
+            tenant.units.tokens -= needed
+
+    def _dispatch(self):
+        while self.running < self.limits["max_concurrency"]:
+            chosen = None
+            for tenant in self.tenants.values():
+                while tenant.queue and tenant.queue[0].future.done():  # Caller went away while queued
+                    tenant.queue.popleft()
+                if not tenant.queue or tenant.running >= tenant.limits["tenant_concurrency"]:
+                    continue
+                head = tenant.queue[0]
+                if chosen is None or (head.start_tag, head.sequence) < (chosen.queue[0].start_tag,
+                                                                          chosen.queue[0].sequence):
+                    chosen = tenant
+            if chosen is None:
+                return
+            job = chosen.queue.popleft()
+            self.virtual_time = max(self.virtual_time, job.start_tag)
+            chosen.running += 1
+            self.running += 1
+            job.future.set_result(None)
+
+    def _release(self, tenant: _TenantState):
+        tenant.running -= 1
+        self.running -= 1
+        tenant.last_active = time.monotonic()
+        self._dispatch()
+
+    def _forget_idle(self):
+        cutoff = time.monotonic() - TENANT_IDLE_TTL
+        for tenant_id in [tenant_id for tenant_id, tenant in self.tenants.items()
+                          if not tenant.queue and not tenant.running and tenant.last_active < cutoff]:
+            del self.tenants[tenant_id]
+
+    async def run(self, tenant_id: str, fn: Callable[..., Any], *args, cost: float = 1.0,
+                  weight: float = 1.0, **kwargs) -> Any:
+        """Queue `fn(*args, **kwargs)` for `tenant_id`, run it on this pool's threads and return its result.
+
+        `weight` applies to a tenant seen for the first time, unless MCQ_TENANTS sets one.
+        """
+        self._forget_idle()
+        tenant = self._tenant(tenant_id, weight)
+        self._check_quota(tenant_id, tenant, cost)
+
+        start_tag = max(self.virtual_time, tenant.last_finish_tag)
+        tenant.last_finish_tag = start_tag + max(cost, 0.0) / tenant.weight
+        job = _Job(cost, start_tag, next(self._sequence), asyncio.get_running_loop().create_future())
+        tenant.queue.append(job)
+        tenant.last_active = time.monotonic()
+        self._dispatch()
+
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            if job.future.done() and not job.future.cancelled():
+                self._release(tenant)  # Granted a slot just as the caller gave up
+            raise
+
+        started = time.monotonic()
+        tenant.queue_wait.append(started - job.enqueued_at)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+            tenant.completed += 1
+            return result
+        except Exception:
+            tenant.failed += 1
+            raise
+        finally:
+            tenant.latency.append(time.monotonic() - job.enqueued_at)
+            self._release(tenant)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._forget_idle()
+        tenants = {}
+        for tenant_id, tenant in sorted(self.tenants.items()):
+            tenants[tenant_id] = {
+                "weight": tenant.weight,
+                "queue_depth": sum(1 for job in tenant.queue if not job.future.done()),
+                "running": tenant.running,
+                "completed": tenant.completed,
+                "failed": tenant.failed,
+                "rejected": tenant.rejected,
+                "queue_wait": latency_stats(list(tenant.queue_wait)),
+                "latency": latency_stats(list(tenant.latency)),
+            }
+        return {
+            "limits": self.limits,
+            "running": self.running,
+            "queue_depth": sum(t["queue_depth"] for t in tenants.values()),
+            "tenants": tenants,
+        }
+
+
+class TenantScheduler:
+    def __init__(self, pools: Optional[Dict[str, Dict[str, Any]]] = None,
+                 tenants: Optional[Dict[str, Dict[str, Any]]] = None):
+        configured = {name: {**limits} for name, limits in DEFAULT_POOLS.items()}
+        for name, limits in (pools or {}).items():
+            configured[name] = {**configured.get(name, DEFAULT_POOLS["llm"]), **limits}
+        self.pools = {name: TenantPool(name, limits, tenants) for name, limits in configured.items()}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "TenantScheduler":
+        config = {}
+        if os.environ.get("MCQ_TENANTS"):
+            try:
+                config = json.loads(os.environ["MCQ_TENANTS"])
+            except json.JSONDecodeError as e:
+                logger.error(f"Ignoring invalid MCQ_TENANTS: {str(e)}")
+        return cls(config.get("pools"), config.get("tenants"))
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """The event loop run_threadsafe() schedules onto; the server's, set at startup."""
+        self.loop = loop
+
+    async def run(self, pool: str, tenant_id: str, fn: Callable[..., Any], *args, cost: float = 1.0,
+                  weight: float = 1.0, **kwargs) -> Any:
+        return await self.pools[pool].run(tenant_id, fn, *args, cost=cost, weight=weight, **kwargs)
+
+    def run_threadsafe(self, pool: str, tenant_id: str, fn: Callable[..., Any], *args, cost: float = 1.0,
+                       weight: float = 1.0, **kwargs) -> Any:
+        """run() from a background thread; blocks until `fn` has run in its turn."""
+        if self.loop is None or self.loop.is_closed():
+            raise RuntimeError("Tenant scheduler is not bound to a running event loop")
+        future = asyncio.run_coroutine_threadsafe(
+            self.run(pool, tenant_id, fn, *args, cost=cost, weight=weight, **kwargs), self.loop
+        )
+        return future.result()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: pool.snapshot() for name, pool in self.pools.items()}
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.executor.shutdown(wait=False)
+
+
+_scheduler: Optional[TenantScheduler] = None
+
+
+def get_scheduler() -> TenantScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TenantScheduler.from_env()
+    return _scheduler
+
+
+def configure_scheduler(pools: Optional[Dict[str, Dict[str, Any]]] = None,
+                        tenants: Optional[Dict[str, Dict[str, Any]]] = None) -> TenantScheduler:
+    global _scheduler
+    shutdown_scheduler()
+    _scheduler = TenantScheduler(pools, tenants)
+    return _scheduler
+
+
+def shutdown_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown()
+        _scheduler = None
+
+
+def tenant_metrics() -> Dict[str, Any]:
+    return _scheduler.metrics() if _scheduler is not None else {}
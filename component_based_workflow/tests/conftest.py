@@ -0,0 +1,23 @@
+# component_based_workflow/tests/conftest.py - Shared fixtures; run with `python -m pytest tests` from component_based_workflow
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_router import reset_route_health  # noqa: E402
+from rate_limiter import reset_limiters  # noqa: E402
+from tenant_scheduler import shutdown_scheduler  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    # Route health, limiters and the scheduler are process-wide; start every test clean
+    reset_route_health()
+    reset_limiters()
+    yield
+    reset_route_health()
+    reset_limiters()
+    shutdown_scheduler()
@@ -0,0 +1,165 @@
+# component_based_workflow/tests/test_llm_router.py - Hedging, failover and circuit breaking against fake providers
+
+import asyncio
+import time
+
+import pytest
+
+import main
+from benchmarks.fakes import FakeChatModel, FakeRateLimitError, FakeServerError
+from llm_router import CircuitBreaker, LLMRoute, LLMRouter, _health, route_metrics
+from rate_limiter import configure_limiter, rate_limit_metrics
+
+
+class CountingChatModel(FakeChatModel):
+    """FakeChatModel that counts its calls and can fail the first `failures` of them."""
+
+    calls: int = 0
+    failures: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise FakeRateLimitError("429 Too Many Requests (fake)") if self.error_status == 429 \
+                else FakeServerError(self.error_status)
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def route(provider: str, model: str, **fake_options) -> LLMRoute:
+    configure_limiter(provider, model, requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9)
+    return LLMRoute(provider, model, CountingChatModel(**fake_options))
+
+
+def test_hedge_runs_after_deadline_and_cancels_the_loser():
+    slow, fast = route("groq", "slow", latency=2.0), route("openai", "fast", latency=0.01)
+    router = LLMRouter([slow, fast], default_hedge_delay=0.05)
+
+    async def call():
+        start = time.monotonic()
+        result = await router.ainvoke("Summarize the document.")
+        await asyncio.sleep(0.05)  # Let the cancelled call unwind
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(call())
+    assert result.content.startswith("Answer")
+    assert elapsed < 1.0
+    metrics = route_metrics()
+    assert metrics["groq:slow"]["cancelled"] == 1
+    assert metrics["openai:fast"]["hedges_started"] == 1
+    assert metrics["openai:fast"]["hedge_wins"] == 1
+
+
+def test_hedge_delay_follows_the_latency_percentile_of_provider_and_model():
+    first = LLMRoute("groq", "model", CountingChatModel(), credential="key-a")
+    second = LLMRoute("groq", "model", CountingChatModel(), credential="key-b")
+    router = LLMRouter([first], default_hedge_delay=2.0, min_samples=5, hedge_percentile=95.0)
+    assert router._hedge_delay(first) == 2.0
+
+    stats, _ = _health(second.key)  # Another API key's calls count toward the same stats
+    for latency in (0.3, 0.3, 0.3, 0.3, 0.5):
+        stats.record(latency, success=True)
+    assert router._hedge_delay(first) == 0.5
+
+
+def test_server_error_fails_over_to_the_next_route():
+    primary = route("groq", "primary", error_ratio=1.0, error_status=503)
+    secondary = route("openai", "secondary")
+    result = asyncio.run(LLMRouter([primary, secondary]).ainvoke("Question?"))
+    assert result.content.startswith("Answer")
+    assert (primary.client.calls, secondary.client.calls) == (1, 1)
+    assert route_metrics()["groq:primary"]["circuit"]["consecutive_failures"] == 1
+
+
+def test_auth_error_does_not_fail_over_or_count_against_the_circuit():
+    primary = route("groq", "primary", error_ratio=1.0, error_status=401)
+    secondary = route("openai", "secondary")
+    with pytest.raises(FakeServerError):
+        asyncio.run(LLMRouter([primary, secondary]).ainvoke("Question?"))
+    assert secondary.client.calls == 0
+    assert route_metrics()["groq:primary"]["circuit"] == {"state": "closed", "consecutive_failures": 0}
+
+
+def test_rate_limit_is_retried_on_the_same_route_after_the_pause():
+    primary = route("groq", "primary", failures=1, error_status=429)
+    secondary = route("openai", "secondary")
+    result = asyncio.run(LLMRouter([primary, secondary], rate_limit_retries=1).ainvoke("Question?"))
+    assert result.content.startswith("Answer")
+    assert (primary.client.calls, secondary.client.calls) == (2, 0)
+    assert rate_limit_metrics()["groq:primary"]["throttle_events"] == 1
+    assert route_metrics()["groq:primary"]["circuit"]["state"] == "closed"
+
+
+def test_rate_limit_is_raised_once_retries_are_used_up():
+    primary = route("groq", "primary", error_ratio=1.0, error_status=429)
+    secondary = route("openai", "secondary")
+    with pytest.raises(FakeRateLimitError):
+        asyncio.run(LLMRouter([primary, secondary], rate_limit_retries=0).ainvoke("Question?"))
+    assert secondary.client.calls == 0
+
+
+def test_open_circuit_is_skipped_until_it_recovers():
+    primary = route("groq", "primary", error_ratio=1.0, error_status=503)
+    secondary = route("openai", "secondary")
+    router = LLMRouter([primary, secondary])
+    _, breaker = _health(primary.key)
+    breaker.recovery_timeout = 0.1
+
+    async def calls(count):
+        for _ in range(count):
+            await router.ainvoke("Question?")
+
+    asyncio.run(calls(breaker.failure_threshold))
+    assert breaker.state == "open"
+    asyncio.run(calls(3))
+    assert primary.client.calls == breaker.failure_threshold  # Not called while open
+
+    time.sleep(0.1)
+    primary.client.error_ratio = 0.0
+    asyncio.run(calls(1))  # The half-open probe succeeds and closes the circuit
+    assert breaker.state == "closed"
+    assert primary.client.calls == breaker.failure_threshold + 1
+
+
+def test_circuit_breaker_goes_open_half_open_closed():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.available()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.available()
+
+    time.sleep(0.05)
+    assert breaker.available() and breaker.state == "half_open"
+    assert breaker.acquire()
+    assert not breaker.acquire()  # Only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"  # A failed probe re-opens at once
+
+    time.sleep(0.05)
+    assert breaker.available() and breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.consecutive_failures == 0
+
+
+def test_cancelled_probe_frees_the_probe_slot():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.available() and breaker.acquire()
+    breaker.release()
+    assert breaker.acquire()
+
+
+def test_fallback_uses_only_keys_from_the_request(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "server-secret")
+
+    def create_client(provider, model_name, api_key, max_retries):
+        return CountingChatModel(model=model_name, api_key=api_key, max_retries=max_retries)
+
+    def keys(**config):
+        router = main.build_llm_router("groq", "primary", "user-key", main.QueryNodeConfig(**config), create_client)
+        return [(r.provider, r.client.api_key, r.client.max_retries) for r in router.routes]
+
+    assert keys(fallback_provider="openai") == [("groq", "user-key", 3)]
+    assert keys(fallback_provider="openai", fallback_api_key="user-openai-key") == [
+        ("groq", "user-key", 0), ("openai", "user-openai-key", 3)]
+    assert keys(fallback_provider="groq", fallback_model_name="other") == [
+        ("groq", "user-key", 0), ("groq", "user-key", 3)]
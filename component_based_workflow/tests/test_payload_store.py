@@ -0,0 +1,24 @@
+# component_based_workflow/tests/test_payload_store.py - Large outputs released once every consumer has run
+
+from main import PayloadRef, PayloadStore
+
+
+def test_payload_is_released_after_its_last_consumer():
+    store = PayloadStore()
+    ref = store.put("pdf_reader", "documents", ["page"] * 3, consumers=2)
+    data = {"documents": ref, "user_id": "user"}
+    assert store.resolve(data) == {"documents": ["page"] * 3, "user_id": "user"}
+
+    store.release(data)
+    assert len(store) == 1
+    store.release(data)
+    assert len(store) == 0
+    store.release(data)  # Releasing again is harmless
+
+
+def test_refs_stand_in_for_the_payload():
+    store = PayloadStore()
+    ref = store.put("vector_store", "vector_store", object(), consumers=1)
+    assert isinstance(ref, PayloadRef)
+    assert (ref.producer, ref.key) == ("vector_store", "vector_store")
+    assert store.resolve({"user_id": "user"}) == {"user_id": "user"}
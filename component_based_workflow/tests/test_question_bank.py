@@ -0,0 +1,91 @@
+# component_based_workflow/tests/test_question_bank.py - Banking, serving without repeats and background refills
+
+import time
+
+import pytest
+
+from question_bank import QuestionBank, QuestionBankConfig, QuestionBankFiller, validate_mcq
+
+
+def mcq(n: int, **overrides):
+    return {"question": f"Which statement about topic {n} is right?", "option_a": f"First {n}",
+            "option_b": f"Second {n}", "option_c": f"Third {n}", "option_d": f"Fourth {n}",
+            "correct_answer": "A", **overrides}
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"))
+    yield bank
+    bank.close()
+
+
+def test_validation_rejects_weak_questions():
+    assert validate_mcq(mcq(1))
+    assert not validate_mcq(mcq(1, option_b="first 1"))  # Duplicate option
+    assert not validate_mcq(mcq(1, option_d="None of the above"))
+    assert not validate_mcq(mcq(1, correct_answer="E"))
+
+
+def test_viewer_is_never_served_a_question_twice(bank):
+    bank.add("owner", "docs", "easy", [mcq(n) for n in range(3)] + [mcq(0)])  # The repeat is dropped
+    ids, first = bank.take("owner", "docs", "easy", "viewer", 2)
+    _, second = bank.take("owner", "docs", "easy", "viewer", 2)
+    assert len(ids) == 2 and len(second) == 1
+    assert {q["question"] for q in first}.isdisjoint(q["question"] for q in second)
+    assert bank.available("owner", "docs", "easy", "viewer") == 0
+    assert bank.available("owner", "docs", "easy", "someone_else") == 3
+
+
+def test_questions_are_scoped_by_owner(bank):
+    bank.add("alice", "docs", "easy", [mcq(1)])
+    assert bank.take("mallory", "docs", "easy", "mallory", 5) == ([], [])
+
+
+def test_unmark_served_returns_questions_to_the_unseen_pool(bank):
+    bank.add("owner", "docs", "easy", [mcq(1), mcq(2)])
+    ids, _ = bank.take("owner", "docs", "easy", "viewer", 2)
+    bank.unmark_served("viewer", ids)
+    assert bank.available("owner", "docs", "easy", "viewer") == 2
+
+
+def test_add_served_drops_questions_the_viewer_has_seen(bank):
+    bank.add("owner", "docs", "easy", [mcq(1)])
+    bank.take("owner", "docs", "easy", "viewer", 1)
+    fresh = bank.add_served("owner", "docs", "easy", "viewer", [mcq(1), mcq(2)])
+    assert [q["question"] for q in fresh] == [mcq(2)["question"]]
+
+
+def test_viewer_refill_generates_one_batch_below_the_low_watermark(bank):
+    filler = QuestionBankFiller(bank, QuestionBankConfig(target_size=20, low_watermark=5, refill_batch=3))
+    requested = []
+
+    def generate(count):
+        start = len(requested) * 10
+        requested.append(count)
+        return [mcq(start + n) for n in range(count)]
+
+    assert filler.request_refill("owner", "docs", "easy", generate, viewer_id="viewer")
+    filler.executor.shutdown(wait=True)
+    assert requested == [3]
+    assert bank.available("owner", "docs", "easy") == 3
+
+    filler = QuestionBankFiller(bank, QuestionBankConfig(target_size=3, low_watermark=1, refill_batch=3))
+    assert not filler.request_refill("owner", "docs", "easy", generate)  # Already at target
+    filler.shutdown()
+
+
+def test_failed_refill_is_counted_and_can_be_retried(bank):
+    filler = QuestionBankFiller(bank, QuestionBankConfig(target_size=5, refill_batch=5))
+
+    def failing(count):
+        raise RuntimeError("provider down")
+
+    assert filler.request_refill("owner", "docs", "easy", failing)
+    deadline = time.monotonic() + 5
+    while filler.snapshot()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert filler.snapshot()["failed"] == 1
+    assert filler.request_refill("owner", "docs", "easy", lambda count: [mcq(n) for n in range(count)])
+    filler.executor.shutdown(wait=True)
+    assert bank.available("owner", "docs", "easy") == 5
@@ -0,0 +1,87 @@
+# component_based_workflow/tests/test_rate_limiter.py - Token buckets, priority queueing and provider headers
+
+import asyncio
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import ProviderLimiter, get_limiter, latency_stats, parse_duration
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("30", 30.0), ("7.66s", 7.66), ("2m59.56s", 179.56), ("120ms", 0.12), ("1h", 3600.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+def test_parse_duration_without_a_duration():
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+
+def test_interactive_calls_overtake_queued_bulk_calls():
+    limiter = ProviderLimiter("groq:test", requests_per_minute=1200, tokens_per_minute=10 ** 9)  # One every 50ms
+    limiter.requests.tokens = 0
+    order = []
+
+    async def call(priority, name):
+        await limiter.acquire(10, priority)
+        order.append(name)
+
+    async def drive():
+        bulk = [asyncio.ensure_future(call("bulk", f"bulk{i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        await asyncio.gather(call("interactive", "interactive"), *bulk)
+
+    asyncio.run(drive())
+    assert order[0] == "interactive"
+    assert order[1:] == ["bulk0", "bulk1", "bulk2"]
+
+
+def test_throttle_pauses_until_retry_after():
+    limiter = ProviderLimiter("groq:test", requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9)
+    limiter.record_throttle({"retry-after": "0.2"})
+
+    async def drive():
+        start = time.monotonic()
+        await limiter.acquire(10)
+        return time.monotonic() - start
+
+    assert asyncio.run(drive()) >= 0.18
+    assert limiter.throttle_events == 1
+
+
+def test_headers_shrink_the_buckets():
+    limiter = ProviderLimiter("groq:test", requests_per_minute=30, tokens_per_minute=12000)
+    limiter.update_from_headers({"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "100",
+                                 "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+    assert limiter.tokens.capacity == 6000
+    assert limiter.tokens.tokens <= 100
+    assert limiter.blocked_until > time.monotonic() + 1.5
+
+
+def test_limiters_are_per_key_and_idle_ones_are_evicted(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "MAX_LIMITERS", 2)
+    first = get_limiter("groq", "model", "key-a")
+    first.record_throttle({"retry-after": "60"})  # Paused, so it must survive eviction
+    assert get_limiter("groq", "model", "key-b") is not first
+    get_limiter("groq", "model", "key-c")
+    get_limiter("groq", "model", "key-d")
+    assert set(rate_limiter.rate_limit_metrics()) == {"groq:model#key-a", "groq:model#key-d"}
+
+
+def test_forked_workers_split_each_limit(monkeypatch):
+    monkeypatch.setenv("MCQ_RATE_LIMIT_WORKERS", "4")
+    monkeypatch.delenv("MCQ_RATE_LIMITS", raising=False)
+    limiter = get_limiter("groq", "model", "key")
+    assert (limiter.requests.capacity, limiter.tokens.capacity) == (30 / 4, 12000 / 4)
+    limiter.update_from_headers({"x-ratelimit-limit-tokens": "6000"})
+    assert limiter.tokens.capacity == 1500
+
+
+def test_latency_stats():
+    assert latency_stats([]) == {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    samples = [n / 1000 for n in range(1, 101)]
+    assert latency_stats(samples, (50, 95, 100)) == {"count": 100, "p50_ms": 51.0, "p95_ms": 95.0, "max_ms": 100.0}
@@ -0,0 +1,94 @@
+# component_based_workflow/tests/test_tenant_scheduler.py - Fair queueing, per-user limits and quotas
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tenant_scheduler import QuotaExceededError, TenantPool, TenantScheduler
+
+LIMITS = {"max_concurrency": 1, "tenant_concurrency": 1, "max_queued": 100, "units_per_minute": None}
+
+
+def test_new_user_is_served_before_a_heavy_users_backlog():
+    pool = TenantPool("llm", LIMITS)
+    order = []
+
+    def work(name):
+        time.sleep(0.01)
+        order.append(name)
+
+    async def drive():
+        heavy = [asyncio.ensure_future(pool.run("heavy", work, f"heavy{i}", cost=5)) for i in range(5)]
+        await asyncio.sleep(0.005)  # The backlog is queued before the light user arrives
+        await asyncio.gather(pool.run("light", work, "light", cost=1), *heavy)
+
+    asyncio.run(drive())
+    assert order.index("light") <= 1  # After at most the job already running
+    pool.executor.shutdown()
+
+
+def test_weight_scales_a_users_share():
+    pool = TenantPool("llm", LIMITS)
+    order = []
+
+    async def drive():
+        jobs = [pool.run(user, order.append, user, cost=1, weight=weight)
+                for _ in range(4) for user, weight in (("bank", 0.25), ("viewer", 1.0))]
+        await asyncio.gather(*jobs)
+
+    asyncio.run(drive())
+    assert order[:4].count("viewer") >= 3
+    pool.executor.shutdown()
+
+
+def test_queue_limit_rejects_with_quota_error():
+    pool = TenantPool("llm", {**LIMITS, "max_queued": 1})
+    release = threading.Event()
+
+    async def drive():
+        running = asyncio.ensure_future(pool.run("user", release.wait))
+        queued = asyncio.ensure_future(pool.run("user", lambda: None))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QuotaExceededError):
+            await pool.run("user", lambda: None)
+        assert pool.snapshot()["tenants"]["user"]["rejected"] == 1
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(drive())
+    pool.executor.shutdown()
+
+
+def test_units_per_minute_quota_reports_retry_after():
+    pool = TenantPool("ingestion", {**LIMITS, "units_per_minute": 10})
+
+    async def drive():
+        await pool.run("user", lambda: None, cost=10)
+        with pytest.raises(QuotaExceededError) as error:
+            await pool.run("user", lambda: None, cost=5)
+        return error.value.retry_after
+
+    assert asyncio.run(drive()) > 0
+    pool.executor.shutdown()
+
+
+def test_run_threadsafe_schedules_onto_the_bound_loop():
+    scheduler = TenantScheduler()
+
+    async def drive():
+        scheduler.bind_loop(asyncio.get_running_loop())
+        return await asyncio.to_thread(scheduler.run_threadsafe, "llm", "user:question_bank", lambda x: x * 2, 21,
+                                       weight=0.25)
+
+    assert asyncio.run(drive()) == 42
+    assert scheduler.metrics()["llm"]["tenants"]["user:question_bank"]["weight"] == 0.25
+    scheduler.shutdown()
+
+
+def test_run_threadsafe_needs_a_bound_loop():
+    scheduler = TenantScheduler()
+    with pytest.raises(RuntimeError):
+        scheduler.run_threadsafe("llm", "user", lambda: None)
+    scheduler.shutdown()
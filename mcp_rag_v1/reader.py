@@ -1,17 +1,217 @@
-# Add to your existing reader.py
+# mcp_rag_v1/reader.py - Extract question/answer pairs from PDFs for the Node.js backend
+#
+#   python reader.py --mode process_qa --file notes.pdf      one PDF, prints a JSON list
+#   python reader.py --mode batch --input pdfs/ --jobs 4     many PDFs across cores, JSON lines
+#   python reader.py --mode worker                           long-running, JSON-lines jobs on stdin
+#
+# Worker protocol: one JSON object per line on stdin, {"id": ..., "path": ..., "max_pairs": ...};
+# one result per line on stdout, {"id": ..., "success": true, "qa_pairs": [...], "elapsed_ms": ...}
+# or {"id": ..., "success": false, "error": "..."}. The first line written is {"ready": true, ...}
+# once imports are done, so the caller knows the worker is warm.
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+
+# Explicit pairs written in the document: "Q: ... A: ...", "Question 3. ... Answer: ..."
+EXPLICIT_QA = re.compile(
+    r"(?:^|\n)\s*(?:Q(?:uestion)?\s*\d*\s*[:.)-])\s*(?P<question>.+?)\s*"
+    r"\n?\s*(?:A(?:ns(?:wer)?)?\s*\d*\s*[:.)-])\s*(?P<answer>.+?)"
+    r"(?=\n\s*(?:Q(?:uestion)?\s*\d*\s*[:.)-])|\n\s*\n|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+# Definitional sentences: "A vector store is a database that ..." -> "What is a vector store?"
+DEFINITION = re.compile(
+    r"^(?P<term>(?:An?\s+|The\s+)?[A-Z][\w\- ]{1,60}?)\s+(?P<verb>is|are|refers to|means)\s+(?P<body>.{15,400})$"
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+
+DEFAULT_MAX_PAIRS = 50
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def load_pages(file_path: str) -> List[str]:
+    """Text of each page; pdfminer is imported here so a warm worker pays for it once."""
+    from pdfminer.high_level import extract_text
+
+    text = extract_text(file_path)
+    return text.split("\f")
+
+
+def _explicit_pairs(page_text: str) -> Iterable[Dict[str, str]]:
+    for match in EXPLICIT_QA.finditer(page_text):
+        question, answer = _clean(match.group("question")), _clean(match.group("answer"))
+        if question and answer:
+            if not question.endswith("?"):
+                question += "?"
+            yield {"question": question, "answer": answer, "kind": "explicit"}
+
+
+def _definition_pairs(page_text: str) -> Iterable[Dict[str, str]]:
+    for sentence in SENTENCE_END.split(_clean(page_text)):
+        match = DEFINITION.match(sentence)
+        if not match:
+            continue
+        term = match.group("term").strip()
+        if term.split()[0] in ("A", "An", "The"):
+            term = term[0].lower() + term[1:]
+        verb = "are" if match.group("verb") == "are" else "is"
+        question = f"What {verb} {term}?"
+        yield {"question": question, "answer": sentence, "kind": "definition"}
+
+
+def extract_qa_from_pdf(file_path: str, max_pairs: Optional[int] = DEFAULT_MAX_PAIRS) -> List[Dict[str, Any]]:
+    """Question/answer pairs found in a PDF, in page order.
+
+    Pairs the document states explicitly (Q:/A:, Question/Answer) come first on
+    each page, followed by questions built from definitional sentences. Duplicate
+    questions are dropped.
+    """
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"No such file: {file_path}")
+
+    qa_pairs: List[Dict[str, Any]] = []
+    seen = set()
+    for page_number, page_text in enumerate(load_pages(file_path), start=1):
+        if not page_text.strip():
+            continue
+        for pair in (*_explicit_pairs(page_text), *_definition_pairs(page_text)):
+            key = pair["question"].lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            qa_pairs.append({**pair, "page": page_number, "source": os.path.basename(file_path)})
+            if max_pairs and len(qa_pairs) >= max_pairs:
+                return qa_pairs
+    return qa_pairs
+
+
+def process_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one job and report the outcome instead of raising, so one bad PDF can't stop a worker."""
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"id": job.get("id"), "path": job.get("path")}
+    try:
+        if not job.get("path"):
+            raise ValueError("Job has no 'path'")
+        qa_pairs = extract_qa_from_pdf(job["path"], job.get("max_pairs", DEFAULT_MAX_PAIRS))
+        result.update(success=True, qa_pairs=qa_pairs, count=len(qa_pairs))
+    except Exception as e:
+        result.update(success=False, error=f"{type(e).__name__}: {str(e)}")
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def _write_line(payload: Dict[str, Any], stream=None):
+    stream = stream or sys.stdout
+    stream.write(json.dumps(payload) + "\n")
+    stream.flush()
+
+
+def run_worker(stdin=None, stdout=None):
+    """Serve jobs from stdin until it closes; imports are done before announcing readiness."""
+    stdin, stdout = stdin or sys.stdin, stdout or sys.stdout
+    # Stray prints from libraries would corrupt the protocol; send them to stderr
+    sys.stdout = sys.stderr
+    import pdfminer.high_level  # noqa: F401 - warm the import before the first job
+
+    _write_line({"ready": True, "pid": os.getpid()}, stdout)
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            _write_line({"id": None, "success": False, "error": f"Invalid job line: {str(e)}"}, stdout)
+            continue
+        if not isinstance(job, dict):
+            _write_line({"id": None, "success": False,
+                         "error": f"Invalid job line: expected an object, got {type(job).__name__}"}, stdout)
+            continue
+        _write_line(process_job(job), stdout)
+
+
+def _find_pdfs(input_path: str) -> List[str]:
+    if os.path.isfile(input_path):
+        return [input_path]
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(input_path)
+        for name in names
+        if name.lower().endswith(".pdf")
+    )
+
+
+def run_batch(input_path: str, jobs: Optional[int] = None, max_pairs: Optional[int] = DEFAULT_MAX_PAIRS,
+              stdout=None) -> Dict[str, Any]:
+    """Process every PDF under `input_path` across `jobs` processes, streaming results as they finish."""
+    stdout = stdout or sys.stdout
+    paths = _find_pdfs(input_path)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths) or 1))
+    start = time.perf_counter()
+    failed = 0
+
+    if jobs == 1:
+        results = (process_job({"id": index, "path": path, "max_pairs": max_pairs}) for index, path in enumerate(paths))
+        for result in results:
+            failed += not result["success"]
+            _write_line(result, stdout)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(process_job, {"id": index, "path": path, "max_pairs": max_pairs})
+                for index, path in enumerate(paths)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                failed += not result["success"]
+                _write_line(result, stdout)
+
+    summary = {
+        "summary": True,
+        "files": len(paths),
+        "failed": failed,
+        "jobs": jobs,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    _write_line(summary, stdout)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract question/answer pairs from PDFs")
+    parser.add_argument("--mode", choices=["process_qa", "worker", "batch"], default="process_qa")
+    parser.add_argument("--file", "--input", "-f", "-i", dest="input", help="PDF file, or directory in batch mode")
+    parser.add_argument("paths", nargs="*", help="PDF file (same as --file; the last one wins)")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Batch mode processes (default: CPU count)")
+    parser.add_argument("--max-pairs", type=int, default=DEFAULT_MAX_PAIRS)
+    args = parser.parse_args(argv)
+
+    if args.mode == "worker":
+        run_worker()
+        return 0
+
+    # The original CLI took the file as the last positional argument
+    input_path = args.input or (args.paths[-1] if args.paths else None)
+    if not input_path:
+        parser.error(f"--mode {args.mode} needs --file")
+
+    if args.mode == "batch":
+        summary = run_batch(input_path, args.jobs, args.max_pairs)
+        return 1 if summary["failed"] else 0
+
+    # Output as JSON for the Node.js backend
+    print(json.dumps(extract_qa_from_pdf(input_path, args.max_pairs)))
+    return 0
+
+
 if __name__ == "__main__":
-    import sys
-    import json
-    
-    if len(sys.argv) > 2 and sys.argv[1] == '--mode':
-        mode = sys.argv[2]
-        
-        if mode == 'process_qa' and len(sys.argv) > 4:
-            input_file = sys.argv[4]
-            
-            # Process PDF and extract Q&A pairs
-            # Use your existing RAG logic here
-            qa_pairs = extract_qa_from_pdf(input_file)  # Implement this using your RAG
-            
-            # Output as JSON for the Node.js backend
-            print(json.dumps(qa_pairs))
\ No newline at end of file
+    sys.exit(main())